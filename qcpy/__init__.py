@@ -1,7 +1,24 @@
 import logging
-from .geometry import Geometry
-from .formats.xyz import XYZFile
+import sys
+import types
 
 __all__ = ['element', 'formats', 'geometry', 'jobs', 'templates', 'utils']
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+
+class _Package(types.ModuleType):
+    """qcpy, importing Geometry and XYZFile on first use as they
+    need NumPy (a module __getattr__ needs Python 3.7)"""
+
+    def __getattr__(self, name):
+        if name == 'Geometry':
+            from .geometry import Geometry
+            return Geometry
+        if name == 'XYZFile':
+            from .formats.xyz import XYZFile
+            return XYZFile
+        raise AttributeError('module {!r} has no attribute {!r}'.format(self.__name__, name))
+
+
+sys.modules[__name__].__class__ = _Package
@@ -1,5 +1,5 @@
-from tqdm import tqdm
 import argparse
+import hashlib
 import logging
 import json
 import os
@@ -7,23 +7,31 @@ import shutil
 import time
 import sys
 from pathlib import Path
-from qcpy.geometry import Geometry
-from qcpy.jobs.gaussian import available_methods, GaussianJob
-from qcpy.formats.gaussian import G09LogFile
+from qcpy.jobs.gaussian import (
+    GaussianJob, UnknownmethodError, available_methods, link1_input, geometry_block
+)
+from qcpy.formats.gaussian import G09LogFile, TERMINATION_STRINGS
 from qcpy.formats import FileFormatError
-from qcpy.utils import scs_e2_correction
-from collections import defaultdict
-
-HAVE_DFTD3_CORRECTION = False
-try:
-    from dftd3 import d3_correction, parameters
-    HAVE_DFTD3_CORRECTION = True
-except Exception as e:
-    pass
+from qcpy.formats.bundle import InputBundle
+from collections import defaultdict, OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 LOG_FORMAT = '[%(name)s]: %(message)s'
 LOG = logging.getLogger(__name__)
 
+# NumPy, tqdm and the qcpy modules built on NumPy (geometry, utils,
+# reactions, scs, results and stats) are imported by the functions
+# using them, so the entry points start (and answer --help) without
+# importing them
+
+
+def tqdm(*args, **kwargs):
+    """A tqdm progress bar, importing tqdm on first use"""
+    from tqdm import tqdm
+    return tqdm(*args, **kwargs)
+
+
 benchmark_methods = {
     'LDA': [
         'svwn5'
@@ -71,6 +79,19 @@ def rsuffix(s, suffix):
     return s
 
 already_dispersion_corrected = ['b97d', 'apfd', 'wb97xd', 'dsdpbep86']
+D3_SUFFIX = ' + d3(bj)'
+PLAN_FILENAME = 'plan.json'
+
+# categories cheap enough that g09 start up dominates their cost
+LINK1_CATEGORIES = ('LDA', 'GGA', 'MGGA')
+LINK1_DIRECTORY = 'link1'
+LINK1_INDEX = 'index.json'
+BUNDLE_FILENAME = 'inputs.sqlite'
+MANIFEST_FILENAME = 'manifest.json'
+RESULTS_FILENAME = 'results.sqlite'
+DISPERSION_CACHE_FILENAME = 'd3_cache.json'
+WATCH_STATE_FILENAME = 'watch.json'
+OUTPUT_INDEX_FILENAME = 'outputs.json'
 
 def read_benchmark_info(filename):
     """Read info.json"""
@@ -79,11 +100,51 @@ def read_benchmark_info(filename):
 
 
 def write_benchmark_info(filename, benchmark_info):
-    with open(filename, 'w') as f:
+    """Write JSON to filename atomically, through a temporary file
+    in the same directory, so readers never see a partial file"""
+    filename = str(filename)
+    tmp = '{}.{}.tmp'.format(filename, os.getpid())
+    with open(tmp, 'w') as f:
         json.dump(benchmark_info, f,
                 sort_keys=True,
                 indent=4, 
                 separators=(',', ': '))
+    os.replace(tmp, filename)
+
+
+def plan_calculations(requested):
+    """Resolve the methods requested to be reported (method names,
+    derived methods like 'b3lyp + d3(bj)' or 'scs-mp2', or categories of
+    benchmark_methods like 'GGA') into the smallest set of g09
+    calculations yielding them all.
+
+    >>> plan_calculations(['b3lyp + d3(bj)', 'scs-mp2', 'sos-mp2'])['calculations']
+    ['b3lyp', 'mp2']
+    """
+    methods = set()
+    calculations = set()
+    for name in requested:
+        names = benchmark_methods.get(name, [name])
+        for method_name in (n.lower() for n in names):
+            base = rsuffix(method_name, D3_SUFFIX)
+            if base not in available_methods:
+                raise UnknownmethodError(method_name)
+            method = available_methods[base]
+            if base != method_name and (method.includes_dispersion or
+                                        base in already_dispersion_corrected):
+                raise UnknownmethodError(
+                    '{} already includes dispersion'.format(base))
+            methods.add(method_name)
+            calculations.add(method.redundancy or base)
+    return {'requested': sorted(methods), 'calculations': sorted(calculations)}
+
+
+def read_plan(directory):
+    """Read the calculation plan in directory, or None if there is none"""
+    filename = Path(directory, PLAN_FILENAME)
+    if filename.exists():
+        return read_benchmark_info(str(filename))
+    return None
 
 
 def guess_geometry_dir(path):
@@ -95,6 +156,7 @@ def guess_geometry_dir(path):
 
 def read_systems(path, required_geometries, *, prefix='', suffix='.xyz', copy_to=None, progress=True):
     """Add the systems to the database"""
+    from qcpy.geometry import Geometry
     app_root = 'qcdb'
     systems = {}
     geometry_dir = guess_geometry_dir(path)
@@ -115,6 +177,41 @@ def read_systems(path, required_geometries, *, prefix='', suffix='.xyz', copy_to
     return systems
 
 
+class GeometryFiles(Mapping):
+    """Mapping of system names to the geometries in path, each read
+    from its xyz file when accessed, keeping only the few most recently
+    used in memory"""
+
+    def __init__(self, path, names, *, suffix='.xyz', cached=8):
+        self.directory = guess_geometry_dir(path)
+        self.names = set(names)
+        self.suffix = suffix
+        self.cached = cached
+        self._geometries = OrderedDict()
+
+    def __getitem__(self, name):
+        from qcpy.geometry import Geometry
+        if name not in self.names:
+            raise KeyError(name)
+        geometry = self._geometries.pop(name, None)
+        if geometry is None:
+            geometry = Geometry.from_xyz_file(Path(self.directory, name + self.suffix),
+                                              parse_comments=True)
+        self._geometries[name] = geometry
+        while len(self._geometries) > self.cached:
+            self._geometries.popitem(last=False)
+        return geometry
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __iter__(self):
+        return iter(sorted(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+
 def read_reactions(reactions, systems, *, prefix='', suffix='.xyz'):
     """Add the Reaction, Reagent etc. database entities from the supplied input"""
     r = {}
@@ -122,14 +219,293 @@ def read_reactions(reactions, systems, *, prefix='', suffix='.xyz'):
         LOG.debug('Processing reaction %s', reaction)
         sys_names = info['reactants'][1] + info['products'][1]
         LOG.debug('systems: %s', sys_names)
-        reaction_systems = [systems[rsuffix(x,suffix)] for x in sys_names]
-        LOG.debug('Contains %s', reaction_systems)
+        for x in sys_names:
+            if rsuffix(x, suffix) not in systems:
+                raise KeyError(rsuffix(x, suffix))
         stoichiometry = [-x for x in info['reactants'][0]] + info['products'][0]
         r[reaction] = [(rsuffix(s, suffix), r) for s, r in zip(sys_names, stoichiometry)]
     return r
 
 
-def create_input_files(root, systems, basis_set, *, progress=True):
+def _gaussian_job(system_name, geometry, method_name, basis_set,
+                  guess_basis_set=None, block=None):
+    ladder = {}
+    if guess_basis_set:
+        ladder = {'guess_basis_set': guess_basis_set,
+                  'chkfile': system_name + '.chk'}
+    return GaussianJob(name='{} {}/{}'.format(system_name, method_name, basis_set),
+                       method=method_name, geometry=geometry, basis_set=basis_set,
+                       geometry_block=block, **ladder)
+
+
+def render_method_inputs(systems, blocks, method_name, basis_set, guess_basis_set=None):
+    """Yield (path relative to calcs, contents) of the input file for
+    each system for a single method"""
+    for name, geom in systems.items():
+        job = _gaussian_job(name, geom, method_name, basis_set,
+                            guess_basis_set, blocks[name])
+        yield '{}/{}.gjf'.format(method_name, name), job.render()
+
+
+def link1_groups(packed, link1):
+    """Split the packed methods into groups of at most link1"""
+    return [packed[i:i + link1] for i in range(0, len(packed), link1)]
+
+
+def render_link1_inputs(systems, blocks, name, packed, link1, basis_set,
+                        guess_basis_set=None):
+    """Yield (path relative to calcs, contents) of each --Link1--
+    packed input file for the system name"""
+    geom = systems[name]
+    for n, group in enumerate(link1_groups(packed, link1)):
+        jobs = (_gaussian_job(name, geom, m, basis_set,
+                              guess_basis_set, blocks[name])
+                for m in group)
+        yield '{}/{}.{}.gjf'.format(LINK1_DIRECTORY, name, n), link1_input(jobs)
+
+
+def _write_inputs(systems, blocks, previous, io, render, *args):
+    """Render the input files for a single task, writing those whose
+    content hash differs from that in the previous manifest below io.
+    If io is None changed inputs are returned instead, to be written to
+    a bundle. Returns the content hash of every input rendered, and a
+    list of any (name, contents) kept"""
+    hashes = {}
+    kept = []
+    directories = set()
+    for name, contents in render(systems, blocks, *args):
+        digest = hashlib.sha256(contents.encode()).hexdigest()
+        hashes[name] = digest
+        if previous.get(name) == digest:
+            continue
+        if io is None:
+            kept.append((name, contents))
+            continue
+        path = io / Path(name)
+        if path.parent not in directories:
+            path.parent.mkdir(exist_ok=True)
+            directories.add(path.parent)
+        with path.open('w') as f:
+            f.write(contents)
+    return hashes, kept
+
+
+_WORKER_SHARED = None
+
+
+def _init_worker(*shared):
+    """Process pool initializer, so shared arguments (systems etc.)
+    are only sent once per worker"""
+    global _WORKER_SHARED
+    _WORKER_SHARED = shared
+
+
+def _call_in_worker(func, *args):
+    return func(*_WORKER_SHARED, *args)
+
+
+def _run_tasks(tasks, shared, jobs=1):
+    """Yield the progress weight and result of each (weight, *arguments)
+    input writing task as it completes, in a pool of processes if jobs > 1"""
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=shared) as pool:
+            futures = {pool.submit(_call_in_worker, _write_inputs, *task): weight
+                       for weight, *task in tasks}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+    else:
+        for weight, *task in tasks:
+            yield weight, _write_inputs(*shared, *task)
+
+
+def write_if_changed(filename, data):
+    """Write data as JSON to filename unless it already holds the
+    same data, leaving its mtime untouched. Returns True if written"""
+    path = Path(filename)
+    if path.exists():
+        try:
+            if read_benchmark_info(str(path)) == json.loads(json.dumps(data)):
+                return False
+        except ValueError:
+            pass
+    write_benchmark_info(str(path), data)
+    return True
+
+
+def _remove_input_files(io, names):
+    """Remove the input files (paths relative to io), and their
+    directories once empty"""
+    for name in names:
+        LOG.debug('Removing %s', name)
+        path = io / Path(name)
+        if path.exists():
+            path.unlink()
+        try:
+            path.parent.rmdir()
+        except OSError:
+            pass
+
+
+class InputManifest:
+    """Content hashes of all generated inputs, stored as JSON in
+    calcs/manifest.json so re-running chembench-init only writes inputs
+    whose content changed, and removes those no longer generated.
+    Inputs are not re-read to check their hashes, only checked to
+    still exist (see check)."""
+
+    def __init__(self, path, output_format='files'):
+        self.path = Path(path)
+        self.output_format = output_format
+        self.previous = {}
+        self.previous_format = None
+        self.stale = {}
+        self.current = {}
+        self.missing = []
+        if self.path.exists():
+            data = read_benchmark_info(str(self.path))
+            self.previous_format = data.get('format')
+            if self.previous_format == output_format:
+                self.previous = data['inputs']
+            else:
+                # written in another format, so all need removing
+                self.stale = data['inputs']
+
+    def check(self, exists):
+        """Forget previous inputs for which exists(name) is false
+        (e.g. deleted by hand), so they are written again"""
+        self.missing = sorted(k for k in self.previous if not exists(k))
+        for name in self.missing:
+            del self.previous[name]
+
+    def update(self, hashes):
+        self.current.update(hashes)
+
+    @property
+    def added(self):
+        return sorted(set(self.current) - set(self.previous) - set(self.missing))
+
+    @property
+    def restored(self):
+        return sorted(set(self.current) & set(self.missing))
+
+    @property
+    def changed(self):
+        return sorted(k for k, v in self.current.items()
+                      if k in self.previous and self.previous[k] != v)
+
+    @property
+    def removed(self):
+        return sorted(set(self.previous) - set(self.current))
+
+    @property
+    def unchanged(self):
+        return sorted(k for k, v in self.current.items() if self.previous.get(k) == v)
+
+    def summary(self):
+        return '{} added, {} changed, {} removed, {} restored, {} unchanged'.format(
+            len(self.added), len(self.changed), len(self.removed),
+            len(self.restored), len(self.unchanged))
+
+    def write(self):
+        return write_if_changed(self.path, {'format': self.output_format,
+                                            'inputs': self.current})
+
+
+class OutputIndex:
+    """The logs in each calculation directory of directory/calcs with
+    their size and mtime, found in a single os.scandir pass so every
+    file is stat'ed once however often the index is used.
+
+    If path is given the index is saved there as JSON by write, and
+    later scans only list directories whose mtime changed since. As
+    appending to a log does not change the mtime of its directory,
+    only save the index once the calculations have finished."""
+
+    def __init__(self, directory, calculations=None, *, suffix='.log', path=None):
+        self.directory = Path(directory, 'calcs')
+        self.calculations = calculations
+        self.suffix = suffix
+        self.path = None if path is None else Path(path)
+        self.previous = {}
+        self.entries = {}
+        self.listed = 0
+        if self.path is not None and self.path.exists():
+            data = read_benchmark_info(str(self.path))
+            if data.get('suffix') == suffix:
+                self.previous = data['directories']
+
+    def scan(self):
+        """List the calculation directories and logs, returning self"""
+        self.entries = {}
+        self.listed = 0
+        with os.scandir(str(self.directory)) as entries:
+            subdirs = [e for e in entries if e.is_dir() and
+                       (self.calculations is None or e.name in self.calculations)]
+        for d in subdirs:
+            mtime = d.stat().st_mtime_ns
+            previous = self.previous.get(d.name)
+            if previous is not None and previous['mtime'] == mtime:
+                self.entries[d.name] = previous
+                continue
+            files = {}
+            with os.scandir(d.path) as entries:
+                for e in entries:
+                    if e.name.endswith(self.suffix):
+                        st = e.stat()
+                        files[e.name] = [st.st_size, st.st_mtime_ns]
+            self.entries[d.name] = {'mtime': mtime, 'files': files}
+            self.listed += 1
+        LOG.debug('Listed %d/%d calculation directories', self.listed, len(self.entries))
+        return self
+
+    def logs(self, name):
+        """{file name: [size, mtime]} of the logs in calculation directory name"""
+        return self.entries[name]['files']
+
+    def items(self):
+        """(calculation directory, logs) pairs"""
+        return [(Path(self.directory, name), entry['files'])
+                for name, entry in self.entries.items()]
+
+    @property
+    def size(self):
+        return sum(size for entry in self.entries.values()
+                   for size, _ in entry['files'].values())
+
+    def write(self):
+        if self.path is None:
+            return False
+        return write_if_changed(self.path, {'suffix': self.suffix,
+                                            'directories': self.entries})
+
+
+def create_input_files(root, systems, basis_set, *, guess_basis_set=None,
+                       link1=None, link1_categories=LINK1_CATEGORIES,
+                       methods=None, jobs=1, bundle=False, manifest=None, progress=True):
+    """Write a g09 input file for each system and non-redundant method
+    to root/calcs/<method>/<system>.gjf. If guess_basis_set is given, each
+    input is a two step --Link1-- job whose first step in guess_basis_set
+    writes the checkpoint read as the guess for the basis_set step.
+
+    If link1 is given, methods in link1_categories are instead packed
+    link1 at a time into multi-step inputs root/calcs/link1/<system>.<n>.gjf,
+    with the methods in each recorded in root/calcs/link1/index.json
+
+    methods restricts the calculations to those given (e.g. from
+    plan_calculations), otherwise all benchmark_methods are used.
+
+    With jobs > 1 inputs are rendered by a pool of that many processes,
+    each task owning a single method subdirectory (or a single system's
+    packed inputs).
+
+    If bundle is set, inputs are written into the single file
+    root/calcs/inputs.sqlite (see InputBundle) rather than a file each.
+
+    Only inputs whose content differs from that recorded in the
+    manifest (root/calcs/manifest.json) are written, and inputs no
+    longer generated are removed. If given, manifest (an InputManifest)
+    is used and left updated, e.g. to report what changed."""
     LOG.debug('Systems = %s', systems)
     io = Path(root, 'calcs')
     skipped = defaultdict(list)
@@ -137,100 +513,273 @@ def create_input_files(root, systems, basis_set, *, progress=True):
     if not io.exists():
         io.mkdir()
 
-    all_methods = sorted({x for value in benchmark_methods.values() for x in value})
+    if methods is None:
+        methods = {x for value in benchmark_methods.values() for x in value}
+    all_methods = sorted(methods)
+    packed = []
+    if link1 and link1 > 1:
+        packed = sorted({x for c in link1_categories for x in benchmark_methods[c]
+                         if available_methods[x].redundancy is None and x in methods})
 
+    destination = None if bundle else io
+    tasks = []
+    index = {}
+    for name in systems:
+        if not packed:
+            break
+        tasks.append((len(packed), destination, render_link1_inputs, name,
+                      packed, link1, basis_set, guess_basis_set))
+        for n, group in enumerate(link1_groups(packed, link1)):
+            index['{}.{}'.format(name, n)] = {
+                'system': name,
+                'methods': group,
+                'steps': 2 if guess_basis_set else 1,
+            }
+    for method_name in all_methods:
+        method = available_methods[method_name]
+        if method_name in packed:
+            continue
+        if method.redundancy is None:
+            tasks.append((len(systems), destination, render_method_inputs,
+                          method_name, basis_set, guess_basis_set))
+        else:
+            skipped[method.redundancy].append(method_name)
+
+    # each geometry is formatted once, not once per method
+    blocks = {name: geometry_block(geom) for name, geom in systems.items()}
+    if manifest is None:
+        manifest = InputManifest(io / Path(MANIFEST_FILENAME),
+                                 'bundle' if bundle else 'files')
+    input_bundle = None
+    if bundle:
+        # without a manifest the bundle's contents are unknown
+        mode = 'a' if manifest.previous else 'w'
+        input_bundle = InputBundle(io / Path(BUNDLE_FILENAME), mode)
+        manifest.check(input_bundle.__contains__)
+    else:
+        manifest.check(lambda name: (io / Path(name)).exists())
+    shared = (systems, blocks, manifest.previous)
     with tqdm(total=len(systems) * len(all_methods),
               desc='Writing input files',
               unit='gjf',
               disable=(not progress)) as pbar:
-        sys = systems.items()
-        for method_name in all_methods:
-            method = available_methods[method_name]
-            if method.redundancy is None:
-                path = io / Path(method_name)
-                if not path.exists():
-                    path.mkdir()
-                for name, geom in sys:
-                    job = GaussianJob(name='{} {}/{}'.format(name,
-                                                             method_name,
-                                                             basis_set),
-                                      method=method_name, geometry=geom, basis_set=basis_set) 
-                    filename = str(path / Path(name+'.gjf')) 
-                    job.write_input_file(filename)
-                    pbar.update(1)
-            else:
-                skipped[method.redundancy].append(method_name)
-                pbar.update(len(sys))
+        pbar.update(len(systems) * sum(len(v) for v in skipped.values()))
+        for weight, (hashes, kept) in _run_tasks(tasks, shared, jobs):
+            manifest.update(hashes)
+            if input_bundle is not None:
+                input_bundle.add_many(kept)
+            pbar.update(weight)
+
+    if input_bundle is not None:
+        for name in manifest.removed:
+            input_bundle.remove(name)
+        input_bundle.close()
+        if manifest.previous_format == 'files':
+            _remove_input_files(io, manifest.stale)
+    else:
+        _remove_input_files(io, manifest.removed)
+        bundle_path = Path(io, BUNDLE_FILENAME)
+        if manifest.previous_format == 'bundle' and bundle_path.exists():
+            bundle_path.unlink()
+    if packed:
+        path = io / Path(LINK1_DIRECTORY)
+        path.mkdir(exist_ok=True)
+        write_if_changed(path / Path(LINK1_INDEX), index)
+    elif Path(io, LINK1_DIRECTORY, LINK1_INDEX).exists():
+        _remove_input_files(io, ['{}/{}'.format(LINK1_DIRECTORY, LINK1_INDEX)])
+    manifest.write()
+    LOG.info('Input files: %s', manifest.summary())
     for k, v in skipped.items():
         LOG.info('Skipping %s: calculation would be redundant when performing %s', ', '.join(v), k)
     return skipped
 
 
-def add_d3_correction_value(l, method_name, system_name, method, energies, systems):
-    """Add a dispersion corrected value if necessary"""
-    if not (method.includes_dispersion or \
-            method_name in already_dispersion_corrected):
+def d3_parameters(method_names):
+    """D3(BJ) parameters {method: parameters} of those method_names
+    that do not already include dispersion and have parameters"""
+    from qcpy.utils import d3bj_parameters
+    parameters = {}
+    for method_name in list(method_names):
+        method = available_methods.get(method_name)
+        if method is None or method.includes_dispersion or \
+                method_name in already_dispersion_corrected:
+            continue
+        try:
+            parameters[method_name] = d3bj_parameters(method_name)
+        except KeyError:
+            LOG.debug('No parameters for %s', method_name)
+    return parameters
+
+
+def add_d3_corrections(energies, systems, cache):
+    """Add dispersion corrected energies for every method read that
+    has D3(BJ) parameters, evaluating all of them for each system in
+    one batch through cache (a D3Cache)"""
+    parameters = d3_parameters(energies)
+    methods_by_system = defaultdict(list)
+    for method_name in parameters:
+        for system_name in energies[method_name]:
+            methods_by_system[system_name].append(method_name)
+
+    for system_name, method_names in methods_by_system.items():
         try:
             s = systems[system_name]
         except KeyError as e:
-            LOG.error('Could not find file %s', f)
+            LOG.error('Could not find geometry for %s', system_name)
             sys.exit(1)
-        if method_name in parameters['bj'].keys():
-            d3, _ = d3_correction(s.as_atomic_numbers(),
-                                  s.as_coordinate_matrix(units='bohr'),
-                                  func=method_name)
+        corrections = cache.corrections(s.as_atomic_numbers(),
+                                        s.as_coordinate_matrix(units='bohr'),
+                                        {m: parameters[m] for m in method_names})
+        for method_name, d3 in corrections.items():
             LOG.debug("Dispersion correction for %s (%s): %s hartree",
                       system_name, method_name, d3)
-            energies[method_name + ' + d3(bj)'][system_name] = l.scf_energy + d3
-        else:
-            LOG.debug('No parameters for %s', method_name)
+            energies[method_name + D3_SUFFIX][system_name] = \
+                energies[method_name][system_name] + d3
 
 
-def add_mp2_variants(system_name, l, energies):
-    dependents = {n: p for n, p in available_methods.items() if p.redundancy == 'mp2'}
-    e_hf = l.hf_energy
-    sc = l.mp2_spin_components
-    LOG.debug('E(%s,mp2) = %s', system_name, l.scf_energy)
-    for method, method in dependents.items():
-        correction = scs_e2_correction(sc, **method.correction)
-        energies[method][system_name] = e_hf + correction
-        LOG.debug('E(%s,%s) = %s + %s = %s', system_name, method, e_hf,
-                  correction, energies[method][system_name])
+def spin_component_records(records):
+    """SpinComponents from {system: (reference energy, components)}"""
+    from qcpy.scs import SpinComponents
+    return SpinComponents.from_records((s, r, c) for s, (r, c) in sorted(records.items()))
 
 
-def read_outputs(directories, systems, pbar, *, suffix='.log', expected=1):
-    energies = defaultdict(dict)
+def add_scs_variants(energies, spin_components):
+    """Add the energies of every registered spin component scaled
+    variant, from the spin components ({base: {system: record}}) read"""
+    from qcpy.scs import scs_variants
+    for base, records in spin_components.items():
+        variants = scs_variants(base)
+        if records and variants:
+            LOG.debug('%d SCS variants of %s for %d systems', len(variants), base, len(records))
+            scaled = spin_component_records(records).energies(variants)
+            energies.update(scaled.as_dict(transpose=True))
 
-    for d in directories:
-        log_files = [f for f in d.iterdir() if f.name.endswith(suffix)]
-        method_name = d.name
 
-        if len(log_files) < expected:
-            LOG.warn('Less log files than expected in %s (%d/%d)',
-                     d, len(log_files), expected)
+def add_energies(f, l, method_name, system_name, proto, energies, systems,
+                 spin_components=None):
+    """Add the energies parsed from log l (read from file f) for
+    system_name and method_name, collecting its spin components in
+    spin_components if method_name is a key of it"""
+    if l.converged:
         try:
-            proto = available_methods[method_name]
-        except KeyError as e:
-            LOG.warn('Unknown method %s', method_name)
+            energies[method_name][system_name] = l.scf_energy
+            if spin_components is not None and method_name in spin_components:
+                spin_components[method_name][system_name] = \
+                    (l.hf_energy, l.mp2_spin_components)
+        except FileFormatError as e:
+            LOG.warning('Invalid G09 log file %s: %s', f, e)
+    else:
+        LOG.warning('Ignoring %s as SCF did not converge', f)
+
+
+def ladder_steps(benchmark_info):
+    """The number of steps in the log of each (unpacked) calculation:
+    two for guess=read basis set ladders, otherwise one"""
+    return 2 if benchmark_info.get('guess basis set') else 1
+
+
+def read_log(f, method_name, energies, systems, spin_components=None, *, steps=1):
+    """Add the energies from the log f of a single method, which
+    should have the given number of steps"""
+    log = G09LogFile.summary(f)
+    if len(log.steps) < steps:
+        # e.g. a ladder cut off after the guess basis step
+        LOG.warning('Ignoring %s as it has %d of %d steps', f, len(log.steps), steps)
+        return
+    # only the final step of basis set ladders is of interest
+    l = log.final_step
+    add_energies(f, l, method_name, Path(f).stem, available_methods[method_name],
+                 energies, systems, spin_components)
+
+
+def read_link1_log(f, entry, energies, systems, spin_components=None):
+    """Split a packed --Link1-- log back into per method energies,
+    using its entry in the index written alongside the inputs"""
+    steps = G09LogFile.summary(f).steps
+    n = entry['steps']
+    for i, method_name in enumerate(entry['methods']):
+        try:
+            l = steps[(i + 1) * n - 1]
+        except IndexError:
+            LOG.warning('No step for %s in %s', method_name, f)
             continue
-        for f in log_files:
-            l = G09LogFile(f)
-            system_name = f.stem
-            if l.converged:
-                try:
-                    energies[method_name][system_name] = l.scf_energy
-                    if HAVE_DFTD3_CORRECTION:
-                        add_d3_correction_value(l, method_name, system_name, proto, energies, systems)
-                        
-                    if method_name == 'mp2':
-                        add_mp2_variants(system_name, l, energies)
-
-                except FileFormatError as e:
-                    LOG.warn('Invalid G09 log file %s: %s', f, e)
-            else:
-                LOG.warn('Ignoring %s as SCF did not converge', f)
-            pbar.update(f.stat().st_size)
+        add_energies(f, l, method_name, entry['system'],
+                     available_methods[method_name], energies, systems,
+                     spin_components)
+
+
+def read_link1_outputs(directory, logs, systems, energies, pbar, *,
+                       spin_components=None):
+    """Read all packed --Link1-- logs ({file name: [size, mtime]}) in directory"""
+    index = read_benchmark_info(str(Path(directory, LINK1_INDEX)))
+    for name, (size, _) in logs.items():
+        f = Path(directory, name)
+        try:
+            entry = index[f.stem]
+        except KeyError:
+            LOG.warning('Ignoring %s as it is not in the %s index', f, LINK1_DIRECTORY)
+            continue
+        read_link1_log(f, entry, energies, systems, spin_components)
+        pbar.update(size)
+
+
+def scs_spin_components():
+    """Empty spin component records for every base method with
+    spin component scaled variants"""
+    return {m.redundancy: {} for m in available_methods.values()
+            if m.correction is not None}
+
+
+def derive_energies(energies, spin_components, systems, dispersion_cache):
+    """Add the energies derived from those read: spin component
+    scaled variants and dispersion corrected methods"""
+    add_scs_variants(energies, spin_components)
+    add_d3_corrections(energies, systems, dispersion_cache)
+
+
+def read_directory(d, logs, systems, energies, pbar, *, expected=1,
+                   spin_components=None, steps=1):
+    """Add the energies from the logs ({file name: [size, mtime]},
+    as listed by OutputIndex) in a single calculation directory,
+    each of which should have the given number of steps"""
+    if d.name == LINK1_DIRECTORY:
+        read_link1_outputs(d, logs, systems, energies, pbar,
+                           spin_components=spin_components)
+        return
+    method_name = d.name
+
+    if len(logs) < expected:
+        LOG.warning('Less log files than expected in %s (%d/%d)',
+                 d, len(logs), expected)
+    if method_name not in available_methods:
+        LOG.warning('Unknown method %s', method_name)
+        return
+    for name, (size, _) in logs.items():
+        read_log(Path(d, name), method_name, energies, systems, spin_components,
+                 steps=steps)
+        pbar.update(size)
+
 
+def read_outputs(index, systems, pbar, *, expected=1,
+                 dispersion_cache=None, spin_components=None, steps=1):
+    """Energies {method: {system: energy}} read from the logs in
+    index (a scanned OutputIndex), with those derived from them. The spin components
+    of methods with SCS variants are collected in spin_components
+    ({base method: {system: (reference energy, components)}})"""
+    from qcpy.utils import D3Cache
+    energies = defaultdict(dict)
+    if spin_components is None:
+        spin_components = {}
+    for base, records in scs_spin_components().items():
+        spin_components.setdefault(base, records)
+
+    for d, logs in index.items():
+        read_directory(d, logs, systems, energies, pbar, expected=expected,
+                       spin_components=spin_components, steps=steps)
+
+    if dispersion_cache is None:
+        dispersion_cache = D3Cache()
+    derive_energies(energies, spin_components, systems, dispersion_cache)
     return energies
 
 
@@ -251,12 +800,26 @@ def generate_inputs():
     for each system required in the reactions specified in info.json
 
     """
-    import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('directory', default='.', 
                         help='Path in which to look for input')
     parser.add_argument('-b', '--basis-set', default='def2qzvpp',
                         help='Basis set for input file jobs')
+    parser.add_argument('--guess-basis-set', default=None,
+                        help='Run a cheap calculation in this basis set first, '
+                             'reading its checkpoint as the initial guess')
+    parser.add_argument('--link1', default=None, type=int, metavar='K',
+                        help='Pack K methods per system into each --Link1-- input')
+    parser.add_argument('--link1-categories', nargs='+', default=list(LINK1_CATEGORIES),
+                        help='Method categories to pack with --link1')
+    parser.add_argument('-j', '--jobs', default=1, type=int,
+                        help='Number of processes writing input files')
+    parser.add_argument('-m', '--methods', nargs='+', default=None,
+                        help='Only the methods (or categories) to be reported, '
+                             "e.g. 'b3lyp + d3(bj)' scs-mp2 GGA. Saved as " + PLAN_FILENAME +
+                             ' which is used by later runs and chembench-process')
+    parser.add_argument('--bundle', default=False, action='store_true',
+                        help='Write inputs into a single file bundle, calcs/' + BUNDLE_FILENAME)
     parser.add_argument('--dry-run', default=True, action='store_false',
                         help="Print what will be done, but don't actually do anything")
     parser.add_argument('-s', '--file-suffix', default='.xyz',
@@ -283,14 +846,55 @@ def generate_inputs():
                            progress=args.progress)
     LOG.debug('Systems: %s', systems)
     reactions = read_reactions(benchmark_info['reactions'], systems, prefix=benchmark_info['benchmark'], suffix=args.file_suffix)
-    skipped = create_input_files(args.directory, systems, args.basis_set, progress=args.progress)
+    if args.methods:
+        plan = plan_calculations(args.methods)
+        write_if_changed(Path(args.directory, PLAN_FILENAME), plan)
+    else:
+        plan = read_plan(args.directory)
+    methods = None
+    if plan is not None:
+        LOG.info('%d calculations needed for %d requested methods',
+                 len(plan['calculations']), len(plan['requested']))
+        methods = set(plan['calculations'])
+
+    manifest = InputManifest(Path(args.directory, 'calcs', MANIFEST_FILENAME),
+                             'bundle' if args.bundle else 'files')
+    skipped = create_input_files(args.directory, systems, args.basis_set,
+                                 guess_basis_set=args.guess_basis_set,
+                                 link1=args.link1,
+                                 link1_categories=args.link1_categories,
+                                 methods=methods,
+                                 jobs=args.jobs,
+                                 bundle=args.bundle,
+                                 manifest=manifest,
+                                 progress=args.progress)
+    LOG.info('%s: %s', args.directory, manifest.summary())
     benchmark_info['post process'] = skipped
-    write_benchmark_info(str(info_file), benchmark_info)
+    benchmark_info['basis set'] = args.basis_set
+    benchmark_info['guess basis set'] = args.guess_basis_set
+    write_if_changed(str(info_file), benchmark_info)
+
 
+def process_outputs(directory, output_directory, progress=False, overwrite=False,
+                    store=None, write_json=True, streaming=False, output_index=False):
+    """Read the energies of all calculations in directory, and compute
+    reaction energies from them. Results are added to store (a ResultsStore,
+    or the path of one, by default results.sqlite in the output directory),
+    replacing any previous results for this benchmark, and also written
+    as energies.json and reaction_energies.json if write_json is set.
 
-def process_outputs(directory, output_directory, progress=False, overwrite=False):
+    If streaming is set, the energies of each calculation directory go
+    straight to the store, derived and reaction energies are computed
+    from the store, and geometries are only read when needed, so memory
+    use does not grow with the size of the benchmark. The JSON files,
+    which would need every result in memory, are not written.
+
+    If output_index is set, the logs found are saved in calcs/outputs.json
+    (see OutputIndex) and only directories changed since are listed."""
+    from qcpy.results import ResultsStore
     info_file = Path(directory, 'info.json')
-    if not overwrite:
+    write_json = write_json and not streaming
+    if not overwrite and write_json:
         if Path(directory, 'reaction_energies.json').exists():
             LOG.info('Skipping %s, already processed', directory)
             return
@@ -308,44 +912,335 @@ def process_outputs(directory, output_directory, progress=False, overwrite=False
     else:
         output_directory = directory
 
+    close_store = not isinstance(store, ResultsStore)
+    if close_store:
+        store = ResultsStore(store or Path(output_directory, RESULTS_FILENAME))
+    try:
+        if not overwrite and not write_json and benchmark_name in store.benchmarks():
+            LOG.info('Skipping %s, already processed', directory)
+            return
+        if streaming:
+            _stream_outputs(directory, benchmark_info, required_geometries, copy_to,
+                            store, progress, output_index)
+        else:
+            _process_outputs(directory, benchmark_info, required_geometries, copy_to,
+                             output_directory, store, write_json, progress, output_index)
+    finally:
+        if close_store:
+            store.close()
+
+
+def index_outputs(directory, plan, *, suffix='.log', output_index=False):
+    """Scanned OutputIndex of the calculation directories in
+    directory/calcs needed by plan (all of them if it is None),
+    saved to calcs/outputs.json if output_index is set"""
+    calculations = None
+    if plan is not None:
+        calculations = set(plan['calculations']) | {LINK1_DIRECTORY}
+    path = Path(directory, 'calcs', OUTPUT_INDEX_FILENAME) if output_index else None
+    index = OutputIndex(directory, calculations, suffix=suffix, path=path).scan()
+    index.write()
+    return index
+
+
+def _process_outputs(directory, benchmark_info, required_geometries, copy_to,
+                     output_directory, store, write_json, progress, output_index):
+    from qcpy.reactions import StoichiometryMatrix
+    from qcpy.utils import D3Cache
+    benchmark_name = benchmark_info['benchmark']
     systems = read_systems(Path(directory),
                            required_geometries,
                            prefix=benchmark_info['benchmark'],
                            copy_to=copy_to,
                            progress=progress)
 
-
-    subdirs = [p for p in Path(directory, 'calcs').iterdir() if p.is_dir()]
+    plan = read_plan(directory)
     t1 = time.time()
-    size_counter = 0
-    suffix = '.log'
-    for d in tqdm(subdirs, desc='Calculating size', disable=(not progress)):
-        for f in d.iterdir():
-            if f.name.endswith(suffix):
-                size_counter += f.stat().st_size
-
-    with tqdm(total=size_counter, desc='Reading energies', unit='B', unit_scale=True,
+    index = index_outputs(directory, plan, output_index=output_index)
+
+    dispersion_cache = D3Cache(Path(directory, DISPERSION_CACHE_FILENAME))
+    with tqdm(total=index.size, desc='Reading energies', unit='B', unit_scale=True,
               disable=(not progress)) as pbar:
-        energies = read_outputs(subdirs, systems, pbar, expected=len(required_geometries))
+        spin_components = {}
+        energies = read_outputs(index, systems, pbar, expected=len(required_geometries),
+                                dispersion_cache=dispersion_cache,
+                                spin_components=spin_components,
+                                steps=ladder_steps(benchmark_info))
+    dispersion_cache.write()
+    LOG.debug('%d new dispersion corrections', dispersion_cache.computed)
     t2 = time.time()
     LOG.debug('%s energies in %s s', len(energies) * len(systems), (t2-t1))
-    write_benchmark_info(Path(output_directory, 'energies.json'),
-                         energies)
+    store.clear(benchmark_name)
     reactions = read_reactions(benchmark_info['reactions'],
                                systems, prefix=benchmark_info['benchmark'])
+    publish_results(benchmark_info, StoichiometryMatrix.from_reactions(reactions),
+                    energies, spin_components, plan, store,
+                    output_directory, write_json)
 
-    reaction_energies = defaultdict(dict)
-    for reaction, stoich in reactions.items():
-        for method_name, sp_energies in energies.items():
-            try:
-                reaction_energies[reaction][method_name] = \
-                        sum(sp_energies[s] * n for s, n in stoich)
-                LOG.debug('Energy for %s/%s: %d', reaction, method_name, reaction_energies[reaction][method_name])
-            except KeyError as e:
-                LOG.debug('Missing single point energy method=%s, system=%s', method_name, e)
 
-    write_benchmark_info(Path(output_directory, 'reaction_energies.json'),
-                         reaction_energies)
+def _stream_outputs(directory, benchmark_info, required_geometries, copy_to,
+                    store, progress, output_index):
+    from qcpy.reactions import StoichiometryMatrix
+    from qcpy.scs import scs_variants
+    from qcpy.utils import D3Cache
+    benchmark_name = benchmark_info['benchmark']
+    basis_set = benchmark_info.get('basis set', '')
+    systems = GeometryFiles(directory, required_geometries)
+    if copy_to is not None:
+        for name in systems:
+            shutil.copy(str(Path(systems.directory, name + systems.suffix)), str(copy_to))
+    plan = read_plan(directory)
+    index = index_outputs(directory, plan, output_index=output_index)
+    store.clear(benchmark_name)
+
+    with tqdm(total=index.size, desc='Reading energies', unit='B', unit_scale=True,
+              disable=(not progress)) as pbar:
+        for d, logs in index.items():
+            energies = defaultdict(dict)
+            spin_components = scs_spin_components()
+            read_directory(d, logs, systems, energies, pbar, expected=len(required_geometries),
+                           spin_components=spin_components,
+                           steps=ladder_steps(benchmark_info))
+            publish_results(benchmark_info, None, energies, spin_components,
+                            None, store, None, False)
+
+    for base in scs_spin_components():
+        variants = scs_variants(base)
+        components = store.spin_components(benchmark_name, base, basis_set=basis_set)
+        if variants and len(components):
+            scaled = components.energies(variants)
+            store.add_energies(benchmark_name, basis_set,
+                               ((system_name, name, energy)
+                                for name, values in scaled.as_dict(transpose=True).items()
+                                for system_name, energy in values.items()))
+
+    dispersion_cache = D3Cache(Path(directory, DISPERSION_CACHE_FILENAME))
+    stream_d3_corrections(store, benchmark_name, basis_set, systems, dispersion_cache)
+    dispersion_cache.write()
+
+    if plan is not None:
+        # only report the methods asked for
+        store.remove_methods(benchmark_name,
+                             set(store.methods(benchmark_name)) - set(plan['requested']))
+    reactions = read_reactions(benchmark_info['reactions'],
+                               systems, prefix=benchmark_info['benchmark'])
+    stoichiometry = StoichiometryMatrix.from_reactions(reactions)
+    for method_name in store.methods(benchmark_name):
+        reaction_energies = stoichiometry.dot(
+            store.matrix(benchmark_name, method=method_name, basis_set=basis_set))
+        store.add_reaction_energies(
+            benchmark_name, basis_set,
+            ((reaction, name, energy)
+             for reaction, values in reaction_energies.as_dict().items()
+             for name, energy in values.items()))
+
+
+def stream_d3_corrections(store, benchmark_name, basis_set, systems, cache, *,
+                          batch_size=1000):
+    """Add dispersion corrected energies to store for every method of
+    benchmark_name with D3(BJ) parameters, reading one system (geometry
+    and energies) at a time"""
+    parameters = d3_parameters(store.methods(benchmark_name))
+    if not parameters:
+        return
+    records = []
+    for system_name in store.systems(benchmark_name):
+        rows = store.query(benchmark=benchmark_name, basis_set=basis_set,
+                           method=list(parameters), system=system_name)
+        if not rows:
+            continue
+        try:
+            s = systems[system_name]
+        except KeyError as e:
+            LOG.error('Could not find geometry for %s', system_name)
+            sys.exit(1)
+        corrections = cache.corrections(s.as_atomic_numbers(),
+                                        s.as_coordinate_matrix(units='bohr'),
+                                        {row[2]: parameters[row[2]] for row in rows})
+        records.extend((system_name, method_name + D3_SUFFIX, energy + corrections[method_name])
+                       for _, _, method_name, _, energy in rows)
+        if len(records) >= batch_size:
+            store.add_energies(benchmark_name, basis_set, records)
+            records = []
+    store.add_energies(benchmark_name, basis_set, records)
+
+
+def publish_results(benchmark_info, stoichiometry, energies, spin_components,
+                    plan, store, output_directory, write_json):
+    """Add the energies (restricted to those requested in plan, if any),
+    spin components and reaction energies to store, and write them as
+    JSON to output_directory if write_json is set"""
+    from qcpy.reactions import EnergyMatrix
+    benchmark_name = benchmark_info['benchmark']
+    basis_set = benchmark_info.get('basis set', '')
+    if plan is not None:
+        # only report the methods asked for
+        requested = set(plan['requested'])
+        energies = {k: v for k, v in energies.items() if k in requested}
+    for method_name, records in spin_components.items():
+        if records:
+            store.add_spin_components(benchmark_name, basis_set, method_name,
+                                      spin_component_records(records))
+    store.add_energies(benchmark_name, basis_set,
+                       ((system_name, method_name, energy)
+                        for method_name, values in energies.items()
+                        for system_name, energy in values.items()))
+    if write_json:
+        write_benchmark_info(Path(output_directory, 'energies.json'),
+                             energies)
+    if stoichiometry is None:
+        return
+
+    reaction_energies = stoichiometry.dot(EnergyMatrix.from_dict(energies))
+    for method_name, count in zip(reaction_energies.columns,
+                                  (~reaction_energies.mask).sum(axis=0)):
+        if count:
+            LOG.info('Missing %d/%d reaction energies for %s', count,
+                     len(reaction_energies.rows), method_name)
+
+    store.add_reaction_energies(
+        benchmark_name, basis_set,
+        ((reaction, method_name, energy)
+         for reaction, values in reaction_energies.as_dict().items()
+         for method_name, energy in values.items()))
+    if write_json:
+        write_benchmark_info(Path(output_directory, 'reaction_energies.json'),
+                             reaction_energies.as_dict())
+
+
+class OutputWatcher:
+    """Process the logs in directory/calcs incrementally as calculations
+    finish. Each poll lists calcs with os.scandir, reads only the bytes
+    appended to each changed log since the offset saved for it, and
+    parses a log once all of its steps have terminated (or one failed).
+    Results are published atomically after every poll that parsed
+    anything, and the offsets and energies read are saved in watch.json
+    so a restarted watcher carries on where it left off."""
+
+    def __init__(self, directory, output_directory=None, *, store=None,
+                 write_json=True, suffix='.log'):
+        from qcpy.reactions import StoichiometryMatrix
+        from qcpy.utils import D3Cache
+        self.directory = Path(directory)
+        self.output_directory = Path(output_directory or directory)
+        self.output_directory.mkdir(exist_ok=True)
+        self.store = store
+        self.write_json = write_json
+        self.suffix = suffix
+        self.benchmark_info = read_benchmark_info(str(Path(directory, 'info.json')))
+        self.systems = read_systems(self.directory,
+                                    get_required_geometries(self.benchmark_info),
+                                    progress=False)
+        self.stoichiometry = StoichiometryMatrix.from_reactions(
+            read_reactions(self.benchmark_info['reactions'], self.systems))
+        self.plan = read_plan(directory)
+        calculations = None
+        if self.plan is not None:
+            calculations = set(self.plan['calculations']) | {LINK1_DIRECTORY}
+        self.index = OutputIndex(directory, calculations, suffix=suffix)
+        self.steps = ladder_steps(self.benchmark_info)
+        self.dispersion_cache = D3Cache(Path(directory, DISPERSION_CACHE_FILENAME))
+        self.state_path = Path(directory, WATCH_STATE_FILENAME)
+        self.offsets = {}
+        self.energies = defaultdict(dict)
+        self.spin_components = scs_spin_components()
+        if self.state_path.exists():
+            state = read_benchmark_info(str(self.state_path))
+            self.offsets = state['offsets']
+            self.energies.update(state['energies'])
+            self.spin_components.update(state['spin components'])
+
+    @staticmethod
+    def _read_terminations(path, offset):
+        """The termination lines among the complete lines of path
+        after offset, and the offset of the end of the last of them"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        prefixes = tuple(t.encode() for t in TERMINATION_STRINGS)
+        terminations = [line for line in data[:end].split(b'\n') if line.startswith(prefixes)]
+        return terminations, offset + end
+
+    def _expected_steps(self, method_name, stem, index):
+        if method_name == LINK1_DIRECTORY:
+            entry = index.get(stem)
+            return None if entry is None else entry['steps'] * len(entry['methods'])
+        return self.steps
+
+    def poll(self):
+        """Parse the logs that finished since the last poll,
+        publishing the results if there were any. Returns the
+        number of logs parsed."""
+        finished = []
+        index = {}
+        for d, logs in self.index.scan().items():
+            if d.name == LINK1_DIRECTORY:
+                index = read_benchmark_info(str(Path(d, LINK1_INDEX)))
+            for name, (size, mtime) in logs.items():
+                key = '{}/{}'.format(d.name, name)
+                path = str(Path(d, name))
+                previous = self.offsets.get(key)
+                if previous is not None and (previous['size'], previous['mtime']) == (size, mtime):
+                    continue
+                if previous is None or size < previous['offset']:
+                    # new, or rewritten by a resubmitted calculation
+                    previous = {'offset': 0, 'terminations': 0, 'failed': False}
+                terminations, offset = self._read_terminations(path, previous['offset'])
+                failed = previous['failed'] or \
+                    any(t.startswith(b' Error termination') for t in terminations)
+                count = previous['terminations'] + len(terminations)
+                expected = self._expected_steps(d.name, name[:-len(self.suffix)], index)
+                if terminations and expected is not None and (count >= expected or failed):
+                    finished.append((d.name, path))
+                self.offsets[key] = {'size': size, 'mtime': mtime,
+                                     'offset': offset, 'terminations': count,
+                                     'failed': failed}
+
+        for method_name, path in finished:
+            LOG.debug('Reading %s', path)
+            if method_name == LINK1_DIRECTORY:
+                read_link1_log(path, index[Path(path).stem], self.energies,
+                               self.systems, self.spin_components)
+            elif method_name in available_methods:
+                read_log(path, method_name, self.energies, self.systems, self.spin_components,
+                         steps=self.steps)
+            else:
+                LOG.warning('Unknown method %s', method_name)
+        if finished:
+            self.publish()
+        return len(finished)
+
+    def publish(self):
+        """Publish the results from all logs read so far"""
+        from qcpy.results import ResultsStore
+        energies = defaultdict(dict, {k: dict(v) for k, v in self.energies.items()})
+        derive_energies(energies, self.spin_components, self.systems, self.dispersion_cache)
+        self.dispersion_cache.write()
+        store = self.store
+        if not isinstance(store, ResultsStore):
+            store = ResultsStore(store or Path(self.output_directory, RESULTS_FILENAME))
+        try:
+            publish_results(self.benchmark_info, self.stoichiometry, energies,
+                            self.spin_components, self.plan, store,
+                            self.output_directory, self.write_json)
+        finally:
+            if store is not self.store:
+                store.close()
+        write_benchmark_info(self.state_path, {'offsets': self.offsets,
+                                               'energies': self.energies,
+                                               'spin components': self.spin_components})
+
+    def run(self, interval=60, iterations=None):
+        """Poll every interval seconds, iterations times or forever"""
+        n = 0
+        while iterations is None or n < iterations:
+            count = self.poll()
+            if count:
+                LOG.info('%s: read %d finished logs', self.directory, count)
+            n += 1
+            if iterations is None or n < iterations:
+                time.sleep(interval)
 
 
 def process_outputs_main():
@@ -354,7 +1249,6 @@ def process_outputs_main():
     leave.
 
     """
-    import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('directory', default='.', 
                         help='Path in which to look for input')
@@ -368,13 +1262,38 @@ def process_outputs_main():
                         help='Location to place resulting/output files')
     parser.add_argument('--progress', default=False,
                         help='Show progress bars')
+    parser.add_argument('--store', default=None,
+                        help='Results store to add to (default: results.sqlite '
+                             'in the output directory)')
+    parser.add_argument('--no-json', dest='json', action='store_false',
+                        help='Only write results to the results store')
+    parser.add_argument('--stream', action='store_true',
+                        help='Process with bounded memory, writing only to the results store')
+    parser.add_argument('--output-index', action='store_true',
+                        help='Save the logs found in calcs/outputs.json, and only list '
+                             'calculation directories changed since the last run')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running, publishing results as calculations finish')
+    parser.add_argument('--interval', type=float, default=60,
+                        help='Seconds between polls in watch mode')
     args = parser.parse_args()
 
     # set the output directory to default if not set
 
     logging.basicConfig(format=LOG_FORMAT, level=args.log_level)
 
-    process_outputs(args.directory, args.output_directory, progress=args.progress)
+    if args.watch:
+        watcher = OutputWatcher(args.directory, args.output_directory,
+                                store=args.store, write_json=args.json)
+        try:
+            watcher.run(args.interval)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    process_outputs(args.directory, args.output_directory, progress=args.progress,
+                    store=args.store, write_json=args.json, streaming=args.stream,
+                    output_index=args.output_index)
 
 
 def process_outputs_batch():
@@ -383,7 +1302,7 @@ def process_outputs_batch():
     leave.
 
     """
-    import argparse
+    from qcpy.results import ResultsStore
     parser = argparse.ArgumentParser()
     parser.add_argument('directory', default='.', 
                         help='Path in which to look for input')
@@ -399,14 +1318,131 @@ def process_outputs_batch():
                         help='Show progress bars')
     parser.add_argument('--overwrite', default=False,
                         help='Overwrite previous processing results')
+    parser.add_argument('--store', default=None,
+                        help='Results store shared by all benchmarks '
+                             '(default: results.sqlite in directory)')
+    parser.add_argument('--no-json', dest='json', action='store_false',
+                        help='Only write results to the results store')
+    parser.add_argument('--stream', action='store_true',
+                        help='Process with bounded memory, writing only to the results store')
+    parser.add_argument('--output-index', action='store_true',
+                        help='Save the logs found in calcs/outputs.json, and only list '
+                             'calculation directories changed since the last run')
     args = parser.parse_args()
 
     # set the output directory to default if not set
 
     logging.basicConfig(filename=args.log_to, format=LOG_FORMAT, level=args.log_level)
 
-    for directory in tqdm(list(Path(args.directory).iterdir()),
-                          desc='Benchmark directories',
-                          unit='dir', disable=(not args.progress)):
-        if directory.is_dir():
-            process_outputs(directory, None, progress=args.progress, overwrite=args.overwrite)
+    with ResultsStore(args.store or Path(args.directory, RESULTS_FILENAME)) as store:
+        for directory in tqdm(list(Path(args.directory).iterdir()),
+                              desc='Benchmark directories',
+                              unit='dir', disable=(not args.progress)):
+            if directory.is_dir():
+                process_outputs(directory, None, progress=args.progress,
+                                overwrite=args.overwrite, store=store,
+                                write_json=args.json, streaming=args.stream,
+                                output_index=args.output_index)
+
+
+def read_references(benchmark_info, reference_file=None, *, key='reference'):
+    """Reference reaction energies, from reference_file (JSON
+    {reaction: value}) if given, otherwise from the key entry of
+    each reaction in info.json"""
+    if reference_file is not None:
+        return read_benchmark_info(str(reference_file))
+    return {r: info[key] for r, info in benchmark_info['reactions'].items()
+            if info.get(key) is not None}
+
+
+def benchmark_statistics(directory, *, reference_file=None, units='kcal/mol',
+                         samples=1000, confidence=0.95):
+    """Error statistics of every method in the reaction_energies.json of
+    directory against the reference values, which are in units.
+    Returns the statistics as {method: {statistic: value}}, and the mean
+    absolute reference value."""
+    from qcpy.reactions import EnergyMatrix
+    from qcpy.stats import HARTREE, bootstrap_confidence_interval, error_statistics
+    import numpy as np
+    benchmark_info = read_benchmark_info(str(Path(directory, 'info.json')))
+    references = read_references(benchmark_info, reference_file)
+    reaction_energies = read_benchmark_info(str(Path(directory, 'reaction_energies.json')))
+    # methods x reactions
+    energies = EnergyMatrix.from_dict(
+        {r: reaction_energies.get(r, {}) for r in references})
+    reference = np.array([references[r] for r in energies.columns], dtype=np.float64)
+    errors = energies.values * HARTREE[units.lower()] - reference
+    statistics = error_statistics(errors)
+    if samples:
+        lower, upper = bootstrap_confidence_interval(errors, samples=samples,
+                                                     confidence=confidence)
+        statistics['mad_ci'] = np.stack((lower, upper), axis=1)
+    result = {}
+    for i, method_name in enumerate(energies.rows):
+        result[method_name] = {k: v[i].tolist() for k, v in statistics.items()}
+    mean_absolute_reference = float(np.abs(reference).mean()) if len(reference) else np.nan
+    return result, mean_absolute_reference
+
+
+def statistics_main():
+    """ Main method to compute error statistics of every method
+    against reference values, for each benchmark directory processed
+    by chembench-process. Writes statistics.json in each directory, and
+    a summary including WTMAD-2 style weighted MADs over all benchmarks.
+
+    """
+    from qcpy.stats import HARTREE, weighted_mad
+    import numpy as np
+    parser = argparse.ArgumentParser()
+    parser.add_argument('directories', nargs='+',
+                        help='Processed benchmark directories')
+    parser.add_argument('-r', '--reference', default=None,
+                        help='JSON file of reference reaction energies (single '
+                             "benchmark only), instead of each reaction's "
+                             "'reference' in info.json")
+    parser.add_argument('-u', '--units', default='kcal/mol', choices=sorted(HARTREE),
+                        help='Units of the reference values')
+    parser.add_argument('-b', '--bootstrap', default=1000, type=int,
+                        help='Bootstrap samples for MAD confidence intervals (0 to skip)')
+    parser.add_argument('--confidence', default=0.95, type=float,
+                        help='Confidence level of bootstrap intervals')
+    parser.add_argument('-o', '--output', default='statistics.json',
+                        help='Summary file over all benchmarks')
+    parser.add_argument('--log-level', default='WARN',
+                        help='Level of log info to display')
+    args = parser.parse_args()
+
+    logging.basicConfig(format=LOG_FORMAT, level=args.log_level)
+    if args.reference is not None and len(args.directories) > 1:
+        parser.error('--reference can only be used with a single benchmark')
+
+    benchmarks = {}
+    mean_absolute_references = {}
+    for directory in args.directories:
+        name = read_benchmark_info(str(Path(directory, 'info.json')))['benchmark']
+        result, mean_reference = benchmark_statistics(
+            directory, reference_file=args.reference, units=args.units,
+            samples=args.bootstrap, confidence=args.confidence)
+        write_benchmark_info(str(Path(directory, 'statistics.json')), result)
+        benchmarks[name] = result
+        mean_absolute_references[name] = mean_reference
+
+    names = sorted(benchmarks)
+    methods = sorted({m for result in benchmarks.values() for m in result})
+    mads = np.full((len(names), len(methods)), np.nan)
+    counts = np.zeros((len(names), len(methods)), dtype=int)
+    for i, name in enumerate(names):
+        for j, method_name in enumerate(methods):
+            if method_name in benchmarks[name]:
+                mads[i, j] = benchmarks[name][method_name]['mad']
+                counts[i, j] = benchmarks[name][method_name]['count']
+    wtmad = weighted_mad(mads, counts,
+                         [mean_absolute_references[n] for n in names],
+                         units=args.units)
+    summary = {
+        'units': args.units,
+        'wtmad2': {m: v for m, v in zip(methods, wtmad.tolist()) if v == v},
+        'mean absolute reference': mean_absolute_references,
+        'benchmarks': {n: {m: s['mad'] for m, s in benchmarks[n].items()} for n in names},
+    }
+    write_benchmark_info(args.output, summary)
@@ -0,0 +1,22 @@
+"""Reference data files
+
+d3_reference.npz
+    DFT-D3 reference C6 coefficients (Z x Z x 7 x 7, atomic units, zero
+    where no reference exists), reference coordination numbers (-1 where
+    no reference exists), <r4>/<r2> expectation values and covalent radii
+    (angstrom) for elements up to Z = 103. S. Grimme, J. Antony, S. Ehrlich
+    and H. Krieg, J. Chem. Phys. 132, 154104 (2010), as distributed with
+    tad-dftd3 0.7.0 (Apache-2.0).
+
+d3bj_parameters.json
+    Becke-Johnson damping parameters (s6, s8, a1, a2) per functional and
+    functional name aliases, from the s-dftd3 parameters.toml distributed
+    with tad-dftd3 0.7.0.
+"""
+import os
+
+DATA_DIRECTORY = os.path.dirname(__file__)
+
+
+def data_file(filename):
+    return os.path.join(DATA_DIRECTORY, filename)
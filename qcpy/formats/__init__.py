@@ -4,7 +4,10 @@ by this library.
 """
 __all__ = [
     "xyz",
-    "gaussian"
+    "gaussian",
+    "bundle",
+    "fchk",
+    "cube",
 ]
 
 
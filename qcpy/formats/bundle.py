@@ -0,0 +1,107 @@
+"""
+Single file (SQLite) bundles of input files, so that tens of thousands
+of small inputs need not each be a file on a shared filesystem
+"""
+from pathlib import Path
+import logging
+import sqlite3
+
+LOG = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inputs (
+    name TEXT PRIMARY KEY,
+    contents TEXT NOT NULL
+)
+"""
+
+
+class InputBundle:
+    """Object for an input bundle, constructed from a filename or a pathlib.Path
+    object. Files are indexed by their path relative to the bundle root
+    e.g. 'b3lyp/h2o.gjf'. mode 'r' opens an existing bundle for reading,
+    'a' for appending (creating it if necessary) and 'w' replaces any
+    existing contents.
+
+    >>> with InputBundle(':memory:', 'w') as bundle:
+    ...     bundle.add('hf/h2.gjf', '#p hf/sto-3g')
+    ...     bundle.names()
+    ...     bundle.read('hf/h2.gjf')
+    ['hf/h2.gjf']
+    '#p hf/sto-3g'
+    """
+
+    def __init__(self, path, mode='r'):
+        self._path = str(path)
+        if mode == 'r':
+            if not Path(self._path).exists():
+                raise FileNotFoundError(self._path)
+            self._connection = sqlite3.connect(
+                'file:{}?mode=ro'.format(Path(self._path).absolute().as_posix()), uri=True)
+        else:
+            self._connection = sqlite3.connect(self._path)
+            self._connection.execute(_SCHEMA)
+            if mode == 'w':
+                self._connection.execute('DELETE FROM inputs')
+
+    @property
+    def path(self):
+        return self._path
+
+    def add(self, name, contents):
+        """Add (or replace) a single file"""
+        self.add_many([(name, contents)])
+
+    def add_many(self, files):
+        """Add (or replace) many (name, contents) pairs at once"""
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO inputs (name, contents) VALUES (?, ?)', files)
+
+    def remove(self, name):
+        self._connection.execute('DELETE FROM inputs WHERE name = ?', (name,))
+
+    def names(self, prefix=''):
+        """All names in the bundle (starting with prefix), sorted"""
+        rows = self._connection.execute(
+            "SELECT name FROM inputs WHERE substr(name, 1, ?) = ? ORDER BY name",
+            (len(prefix), prefix))
+        return [row[0] for row in rows]
+
+    def read(self, name):
+        """Return the contents of the file name"""
+        row = self._connection.execute(
+            'SELECT contents FROM inputs WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return row[0]
+
+    def extract(self, name, directory='.'):
+        """Write the file name into directory (without its
+        subdirectories), returning the path written"""
+        path = Path(directory, Path(name).name)
+        LOG.debug('Extracting %s from %s to %s', name, self._path, path)
+        with path.open('w') as f:
+            f.write(self.read(name))
+        return path
+
+    def __contains__(self, name):
+        return self._connection.execute(
+            'SELECT 1 FROM inputs WHERE name = ?', (name,)).fetchone() is not None
+
+    def __len__(self):
+        return self._connection.execute('SELECT COUNT(*) FROM inputs').fetchone()[0]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.commit()
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __str__(self):
+        return "InputBundle: {}".format(self._path)
@@ -0,0 +1,307 @@
+"""
+Reader and writer for Gaussian cube files of volumetric data
+"""
+from pathlib import Path
+import logging
+import mmap
+import os
+import numpy as np
+from . import FileFormatError
+
+LOG = logging.getLogger(__name__)
+
+VALUES_PER_LINE = 6
+WIDTH = 13
+NEWLINES = (ord('\n'), ord('\r'))
+# values converted at once, so intermediate arrays stay in cache
+CHUNK_SIZE = 16384
+# exactly representable, so scaling by them rounds once
+POWERS_OF_TEN = 10.0 ** np.arange(23)
+
+
+def _scale(values, exponent):
+    """values / 10**exponent, for |exponent| < len(POWERS_OF_TEN)"""
+    power = POWERS_OF_TEN[np.abs(exponent)]
+    return np.where(exponent < 0, values * power, values / power)
+
+
+def _near_halfway(scaled):
+    """Whether scaled is within a few ulp of halfway between integers"""
+    return np.abs(scaled - np.floor(scaled) - 0.5) <= 4 * np.spacing(scaled)
+
+
+def format_reals(values):
+    """Format values as '%13.5E' would, returning an (N, 13) uint8 array
+    of characters. The rounded mantissa and the exponent are found
+    arithmetically, falling back to '%' formatting for values too close
+    to halfway between two mantissas to round arithmetically, whose
+    exponent is out of the range of exact powers of ten, or not finite
+
+    >>> format_reals(np.array([-123.456789, 0.5])).tobytes()
+    b' -1.23457E+02  5.00000E-01'
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    magnitude = np.abs(values)
+    nonzero = magnitude > 0
+    regular = np.isfinite(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exponent = np.floor(np.log10(np.where(nonzero & regular, magnitude, 1.0))).astype(np.int64)
+        regular &= np.abs(exponent - 5) < len(POWERS_OF_TEN) - 1
+        exponent[~regular] = 0
+        scaled = _scale(magnitude, exponent - 5)
+        # scaled is itself rounded, so values within a few ulp of halfway
+        # may round the other way than their exact decimal value; this
+        # is checked before and after any rescaling, as rounding a tie
+        # up may carry to the next exponent
+        regular &= ~_near_halfway(scaled)
+        mantissa = np.rint(scaled)
+        # log10 may be one out near powers of ten, and rounding may carry
+        high = mantissa >= 1000000
+        low = nonzero & (mantissa < 100000)
+        exponent += high
+        exponent -= low
+        scaled = np.where(high | low, _scale(magnitude, exponent - 5), scaled)
+        regular &= ~_near_halfway(scaled)
+        mantissa = np.where(regular, np.rint(scaled), 0).astype(np.int64)
+    regular &= np.abs(exponent) < 100
+
+    chars = np.empty((len(values), WIDTH), dtype=np.uint8)
+    chars[:, 0] = ord(' ')
+    chars[:, 1] = np.where(np.signbit(values), ord('-'), ord(' '))
+    chars[:, 3] = ord('.')
+    chars[:, 9] = ord('E')
+    chars[:, 10] = np.where(exponent < 0, ord('-'), ord('+'))
+    for column in (8, 7, 6, 5, 4, 2):
+        mantissa, digit = np.divmod(mantissa, 10)
+        chars[:, column] = digit + ord('0')
+    exponent = np.abs(exponent)
+    chars[:, 11] = exponent // 10 + ord('0')
+    chars[:, 12] = exponent % 10 + ord('0')
+    for i in np.flatnonzero(~regular):
+        chars[i] = np.frombuffer('{:13.5E}'.format(values[i])[-WIDTH:].encode(), dtype=np.uint8)
+    return chars
+
+
+def _parse_block(fields):
+    """Convert fixed width E12.5 (or e) fields (right aligned in the columns
+    of fields) arithmetically, from the exact integer mantissa and an
+    exact power of ten, and any others one at a time by float()"""
+    lead, fraction, exponent = fields[:, -11], fields[:, -9:-4], fields[:, -2:]
+    regular = (fields[:, -10] == ord('.')) & ((fields[:, -4] | 0x20) == ord('e'))
+    regular &= (fields[:, :-12] == ord(' ')).all(axis=1)
+    mantissa = lead.astype(np.int64) - ord('0')
+    digits = [lead] + [fraction[:, i] for i in range(5)] + [exponent[:, 0], exponent[:, 1]]
+    for digit in digits:
+        regular &= (digit >= ord('0')) & (digit <= ord('9'))
+    for i in range(5):
+        mantissa *= 10
+        mantissa += fraction[:, i]
+        mantissa -= ord('0')
+    power = (exponent[:, 0].astype(np.int64) - ord('0')) * 10 + exponent[:, 1] - ord('0')
+    power = np.where(fields[:, -3] == ord('-'), -power, power) - 5
+    regular &= np.abs(power) < len(POWERS_OF_TEN)
+    values = _scale(mantissa, np.where(regular, -power, 0))
+    np.negative(values, out=values, where=fields[:, -12] == ord('-'))
+    for i in np.flatnonzero(~regular):
+        values[i] = float(fields[i].tobytes())
+    return values
+
+
+def parse_reals(chars, count):
+    """Convert the characters (a uint8 array, without newlines) of count
+    whitespace separated reals, converting fixed width fields in blocks
+    where they are, otherwise splitting them
+
+    >>> parse_reals(np.frombuffer(b' -1.23457E+02  5.00000E-01', dtype=np.uint8), 2)
+    array([-123.457,    0.5  ])
+    """
+    if count and len(chars) % count == 0 and len(chars) // count >= 12:
+        fields = chars.reshape(count, -1)
+        values = np.empty(count)
+        try:
+            for start in range(0, count, CHUNK_SIZE):
+                values[start:start + CHUNK_SIZE] = _parse_block(fields[start:start + CHUNK_SIZE])
+            return values
+        except ValueError:
+            LOG.debug('Values are not in fixed width fields')
+    return np.array(chars.tobytes().split(), dtype=np.float64)
+
+
+class CubeFile:
+    """Object for a cube file, constructed from a filename or a pathlib.Path
+    object. The header (comments, origin, voxel axes and atoms) is read
+    on construction, and the volumetric data only when first accessed,
+    as an (nx, ny, nz) array, with a last axis for multiple values per
+    point. Positions are in bohr, unless the file is in angstrom
+    (indicated by negative voxel counts) as given by units.
+
+    With cache set, the data is saved alongside the file as '<name>.npy'
+    once parsed, and later read from there, memory mapped."""
+
+    def __init__(self, path, *, cache=False):
+        if not isinstance(path, Path):
+            path = Path(path)
+        self.path = path
+        self.filename = path.name
+        self.cache = cache
+        self._data = None
+        with path.open('rb') as cube_file:
+            self._read_header(cube_file)
+            self._offset = cube_file.tell()
+
+    def _read_header(self, cube_file):
+        def fields(line_number, expected):
+            tokens = cube_file.readline().split()
+            if len(tokens) < expected:
+                raise FileFormatError(self.filename, line_number,
+                                      'expected {} values, found {}'.format(expected, len(tokens)))
+            return tokens
+
+        self.comments = tuple(cube_file.readline().decode().rstrip('\r\n') for _ in range(2))
+        tokens = fields(3, 4)
+        natoms = int(tokens[0])
+        self.origin = np.array([float(x) for x in tokens[1:4]])
+        self.shape = []
+        self.axes = np.empty((3, 3))
+        for i in range(3):
+            tokens = fields(4 + i, 4)
+            self.shape.append(abs(int(tokens[0])))
+            self.axes[i] = [float(x) for x in tokens[1:4]]
+        self.shape = tuple(self.shape)
+        self.units = 'angstrom' if int(tokens[0]) < 0 else 'bohr'
+        numbers, charges, positions = [], [], []
+        for i in range(abs(natoms)):
+            tokens = fields(7 + i, 5)
+            numbers.append(int(tokens[0]))
+            charges.append(float(tokens[1]))
+            positions.append([float(x) for x in tokens[2:5]])
+        self.atomic_numbers = np.array(numbers, dtype=int)
+        self.nuclear_charges = np.array(charges)
+        self.positions = np.array(positions).reshape(-1, 3)
+        self.dataset_ids = None
+        if natoms < 0:
+            tokens = cube_file.readline().split()
+            self.dataset_ids = [int(x) for x in tokens[1:int(tokens[0]) + 1]]
+
+    @property
+    def geometry(self):
+        """The atoms as a Geometry"""
+        from ..geometry import Geometry
+        return Geometry.from_atomic_numbers(self.atomic_numbers, self.positions,
+                                            units=self.units)
+
+    @property
+    def data_shape(self):
+        if self.dataset_ids and len(self.dataset_ids) > 1:
+            return self.shape + (len(self.dataset_ids),)
+        return self.shape
+
+    @property
+    def sidecar(self):
+        """The path of the .npy cache of the data"""
+        return self.path.with_name(self.path.name + '.npy')
+
+    @property
+    def data(self):
+        """The volumetric data, parsed (or loaded from the cache) on first use"""
+        if self._data is None:
+            if self.cache and self._sidecar_valid():
+                LOG.debug('Loading data for %s from %s', self.filename, self.sidecar)
+                self._data = np.load(str(self.sidecar), mmap_mode='r')
+            else:
+                self._data = self._read_data()
+                if self.cache:
+                    self._write_sidecar()
+        return self._data
+
+    def _sidecar_valid(self):
+        try:
+            if self.sidecar.stat().st_mtime_ns < self.path.stat().st_mtime_ns:
+                return False
+            header = np.load(str(self.sidecar), mmap_mode='r')
+        except (OSError, ValueError):
+            return False
+        return header.shape == self.data_shape
+
+    def _write_sidecar(self):
+        temporary = self.sidecar.with_name(self.sidecar.name + '.tmp')
+        with temporary.open('wb') as npy_file:
+            np.save(npy_file, self._data)
+        os.replace(str(temporary), str(self.sidecar))
+
+    def _read_data(self):
+        LOG.debug('Reading data from %s', self.filename)
+        count = int(np.prod(self.data_shape))
+        with self.path.open('rb') as cube_file:
+            try:
+                buffer = mmap.mmap(cube_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise FileFormatError(self.filename, None, 'no data')
+        with buffer:
+            data = np.frombuffer(buffer, dtype=np.uint8, offset=self._offset)
+            chars = data[(data != NEWLINES[0]) & (data != NEWLINES[1])]
+            del data
+        values = parse_reals(chars, count)
+        if len(values) != count:
+            raise FileFormatError(self.filename, None,
+                                  'expected {} values, found {}'.format(count, len(values)))
+        return values.reshape(self.data_shape)
+
+    def write(self, path, data=None):
+        """Write this cube, or data derived from it (with the same
+        shape), as a new cube file with the same header"""
+        write_cube(path, self.data if data is None else data,
+                   self.atomic_numbers, self.positions, origin=self.origin,
+                   axes=self.axes, units=self.units, comments=self.comments,
+                   nuclear_charges=self.nuclear_charges, dataset_ids=self.dataset_ids)
+
+    def __str__(self):
+        return "CubeFile: {} ({} atoms, {})".format(self.filename, len(self.atomic_numbers),
+                                                    'x'.join(str(n) for n in self.shape))
+
+
+def write_cube(path, data, atomic_numbers, positions, *, origin=(0.0, 0.0, 0.0),
+               axes=None, units='bohr', comments=('', ''),
+               nuclear_charges=None, dataset_ids=None):
+    """Write data, an (nx, ny, nz) array (or (nx, ny, nz, n) with
+    dataset_ids), as a cube file, with positions, origin and axes
+    (the voxel vectors, defaulting to unit vectors) in units.
+    The values are formatted in bulk, in blocks of rows."""
+    data = np.asarray(data, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    axes = np.eye(3) if axes is None else np.asarray(axes, dtype=np.float64)
+    if nuclear_charges is None:
+        nuclear_charges = atomic_numbers
+    sign = -1 if units == 'angstrom' else 1
+    natoms = len(positions) * (-1 if dataset_ids else 1)
+    header = [comments[0], comments[1],
+              '{:5d}{:12.6f}{:12.6f}{:12.6f}'.format(natoms, *origin)]
+    for n, axis in zip(data.shape[:3], axes):
+        header.append('{:5d}{:12.6f}{:12.6f}{:12.6f}'.format(sign * n, *axis))
+    for number, charge, position in zip(atomic_numbers, nuclear_charges, positions):
+        header.append('{:5d}{:12.6f}{:12.6f}{:12.6f}{:12.6f}'.format(
+            int(number), float(charge), *position))
+    if dataset_ids:
+        header.append(''.join('{:5d}'.format(x) for x in [len(dataset_ids)] + list(dataset_ids)))
+
+    # each row of values along z is written over lines of 6 values
+    rows = data.reshape(data.shape[0] * data.shape[1], -1)
+    row_length = rows.shape[1]
+    full, remainder = divmod(row_length, VALUES_PER_LINE)
+    line_length = VALUES_PER_LINE * WIDTH + 1
+    row_bytes = full * line_length + (remainder * WIDTH + 1 if remainder else 0)
+    rows_per_chunk = max(1, CHUNK_SIZE // max(row_length, 1))
+    with Path(path).open('wb') as cube_file:
+        cube_file.write(('\n'.join(header) + '\n').encode())
+        for start in range(0, len(rows), rows_per_chunk):
+            block = rows[start:start + rows_per_chunk]
+            chars = format_reals(block).reshape(len(block), row_length * WIDTH)
+            out = np.empty((len(block), row_bytes), dtype=np.uint8)
+            lines = out[:, :full * line_length].reshape(len(block), full, line_length)
+            lines[:, :, :-1] = chars[:, :full * VALUES_PER_LINE * WIDTH].reshape(
+                len(block), full, line_length - 1)
+            lines[:, :, -1] = NEWLINES[0]
+            if remainder:
+                out[:, full * line_length:-1] = chars[:, full * VALUES_PER_LINE * WIDTH:]
+                out[:, -1] = NEWLINES[0]
+            cube_file.write(out.tobytes())
@@ -0,0 +1,314 @@
+"""
+Reader for Gaussian formatted checkpoint (.fchk) files
+"""
+from collections import namedtuple
+from pathlib import Path
+import logging
+import mmap
+import numpy as np
+from . import FileFormatError
+
+LOG = logging.getLogger(__name__)
+
+# values per line and width of each value for every array type
+ARRAY_FORMATS = {'I': (6, 12), 'R': (5, 16), 'C': (5, 12), 'H': (9, 8), 'L': (72, 1)}
+ARRAY_DTYPES = {'I': np.int64, 'R': np.float64}
+NEWLINES = (ord('\n'), ord('\r'))
+# exactly representable, so mantissa / 10**n is correctly rounded
+POWERS_OF_TEN = 10.0 ** np.arange(23)
+ZEROS = 0x3030303030303030
+NINES = 0x0606060606060606
+HIGH_NIBBLES = 0xF0F0F0F0F0F0F0F0
+CHUNK_SIZE = 16384
+# (multiplier, shift, mask) combining the little endian digits of a word
+SWAR_STEPS = ((10, 8, 0x00FF00FF00FF00FF),
+              (100, 16, 0x0000FFFF0000FFFF),
+              (10000, 32, 0xFFFFFFFF))
+
+FchkEntry = namedtuple('FchkEntry', 'kind count start end')
+
+
+def fortran_float(text):
+    """float() of a Fortran real, which may have a D exponent,
+    or no exponent letter at all for three digit exponents
+
+    >>> fortran_float(b'  1.00000000-100'), fortran_float(' 2.5D+01')
+    (1e-100, 25.0)
+    """
+    if isinstance(text, bytes):
+        text = text.decode()
+    text = text.strip().upper().replace('D', 'E')
+    sign = max(text.rfind('+'), text.rfind('-'))
+    if sign > 0 and text[sign - 1] != 'E':
+        text = text[:sign] + 'E' + text[sign:]
+    return float(text)
+
+
+def _parse_digits(digits):
+    """The integers of rows of 8 ASCII digits (an (N, 8) uint8 array),
+    combining pairs, then fours, then eights of digits within uint64
+    words, and whether each row was all digits"""
+    words = np.ascontiguousarray(digits).view('<u8').ravel() - np.uint64(ZEROS)
+    shifted = words + np.uint64(NINES)
+    shifted |= words
+    shifted &= np.uint64(HIGH_NIBBLES)
+    valid = shifted == 0
+    for multiplier, shift, mask in SWAR_STEPS:
+        np.right_shift(words, np.uint64(shift), out=shifted)
+        words *= np.uint64(multiplier)
+        words += shifted
+        words &= np.uint64(mask)
+    return words.view(np.int64), valid
+
+
+def _parse_block(fields):
+    fraction, regular = _parse_digits(fields[:, 4:12])
+    lead = fields[:, 2].astype(np.int64) - ord('0')
+    tens = fields[:, 14].astype(np.int64) - ord('0')
+    units = fields[:, 15].astype(np.int64) - ord('0')
+    regular &= (fields[:, 3] == ord('.')) & (fields[:, 12] == ord('E'))
+    for digit in (lead, tens, units):
+        regular &= (digit >= 0) & (digit <= 9)
+    exponent = tens * 10 + units
+    exponent = np.where(fields[:, 13] == ord('-'), -exponent, exponent) - 8
+    regular &= np.abs(exponent) < len(POWERS_OF_TEN)
+    scale = POWERS_OF_TEN[np.where(regular, np.abs(exponent), 0)]
+    mantissa = lead * 100000000 + fraction
+    values = np.where(exponent < 0, mantissa / scale, mantissa * scale)
+    np.negative(values, out=values, where=fields[:, 1] == ord('-'))
+    if not regular.all():
+        irregular = np.flatnonzero(~regular)
+        values[irregular] = [fortran_float(fields[i].tobytes()) for i in irregular]
+    return values
+
+
+def parse_reals(fields):
+    """Convert an (N, 16) uint8 array of Fortran E16.8 fields (as written
+    to fchk files) to floats. Fields in the usual layout are converted
+    arithmetically, dividing the exact integer mantissa by an exact
+    power of ten so the results are rounded as by float(), and any
+    others one at a time by fortran_float. This is done in blocks of
+    CHUNK_SIZE fields so the intermediate arrays stay in cache.
+
+    >>> chars = np.frombuffer(b' -1.23456789E+02  5.00000000E-01', dtype=np.uint8)
+    >>> parse_reals(chars.reshape(-1, 16))
+    array([-123.456789,    0.5     ])
+    """
+    values = np.empty(len(fields))
+    for start in range(0, len(fields), CHUNK_SIZE):
+        values[start:start + CHUNK_SIZE] = _parse_block(fields[start:start + CHUNK_SIZE])
+    return values
+
+
+class FchkFile:
+    """Object for a formatted checkpoint file, constructed from a filename
+    or a pathlib.Path object. The file is memory mapped, and indexed in
+    one pass over the section headers, skipping each array by its size.
+    Arrays are only converted (in bulk, by NumPy) when first accessed.
+
+    Entries are accessed by their header name, e.g.
+    fchk['Alpha MO coefficients'] or fchk['Total Energy']."""
+
+    def __init__(self, path):
+        if not isinstance(path, Path):
+            path = Path(path)
+        self.filename = path.name
+        self._values = {}
+        self._index = {}
+        with path.open('rb') as fchk_file:
+            try:
+                self._mmap = mmap.mmap(fchk_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise FileFormatError(self.filename, 1, 'empty file')
+        self._build_index()
+
+    def _line(self, pos):
+        end = self._mmap.find(b'\n', pos)
+        if end == -1:
+            end = len(self._mmap)
+        return self._mmap[pos:end].decode().rstrip('\r'), end
+
+    def _build_index(self):
+        self.title, end = self._line(0)
+        line, end = self._line(end + 1)
+        self.job_type = line[:10].strip()
+        self.method = line[10:40].strip()
+        self.basis_set = line[40:].strip()
+        pos = end + 1
+        while pos < len(self._mmap):
+            line, end = self._line(pos)
+            if not line.strip():
+                pos = end + 1
+                continue
+            name, kind, rest = line[:40].strip(), line[43:44], line[44:]
+            if kind not in ARRAY_FORMATS:
+                raise FileFormatError(self.filename, self._mmap[:pos].count(b'\n') + 1,
+                                      'expected a section header, found {!r}'.format(line))
+            if 'N=' in rest:
+                count = int(rest.split('N=')[1])
+                end = self._skip_array(end + 1, kind, count)
+                self._index[name] = FchkEntry(kind, count, pos, end)
+            else:
+                self._index[name] = FchkEntry(kind, None, pos, end)
+                self._values[name] = self._scalar(kind, rest.strip())
+            pos = end + 1
+
+    def _skip_array(self, start, kind, count):
+        """The offset of the newline ending the array starting at start,
+        calculated from the fixed line length and checked"""
+        per_line, width = ARRAY_FORMATS[kind]
+        lines = -(-count // per_line)
+        if lines == 0:
+            return start - 1
+        first = self._mmap.find(b'\n', start)
+        if lines == 1 or first == -1:
+            return len(self._mmap) if first == -1 else first
+        newline = first + 1 - start - per_line * width
+        remaining = count - (lines - 1) * per_line
+        end = start + (lines - 1) * (first + 1 - start) + remaining * width + newline - 1
+        if self._mmap[end:end + 1] == b'\n':
+            return end
+        # irregular lines, so find the newlines instead
+        end = first
+        for _ in range(lines - 1):
+            end = self._mmap.find(b'\n', end + 1)
+            if end == -1:
+                # truncated, reported when the array is read
+                return len(self._mmap)
+        return end
+
+    @staticmethod
+    def _scalar(kind, value):
+        if kind == 'I':
+            return int(value)
+        if kind == 'R':
+            return float(value)
+        if kind == 'L':
+            return value == 'T'
+        return value
+
+    def _data(self, entry):
+        """The characters of the values of an array entry, without
+        the newlines, taking the fixed width lines as one block"""
+        per_line, width = ARRAY_FORMATS[entry.kind]
+        start = self._mmap.find(b'\n', entry.start) + 1
+        if entry.end <= start:
+            return np.zeros(0, dtype=np.uint8)
+        # a truncated array ends at the end of the file
+        data = np.frombuffer(self._mmap, dtype=np.uint8,
+                             count=min(entry.end + 1, len(self._mmap)) - start, offset=start)
+        line_length = self._mmap.find(b'\n', start) + 1 - start
+        full = entry.count // per_line
+        if line_length - per_line * width in (1, 2) and len(data) >= full * line_length and \
+                (data[line_length - 1:full * line_length:line_length] == NEWLINES[0]).all():
+            body = data[:full * line_length].reshape(full, line_length)
+            rest = data[full * line_length:]
+            chars = np.concatenate((body[:, :per_line * width].ravel(),
+                                    rest[(rest != NEWLINES[0]) & (rest != NEWLINES[1])]))
+        else:
+            chars = data[(data != NEWLINES[0]) & (data != NEWLINES[1])]
+        del data
+        return chars
+
+    def _array(self, name, entry):
+        _, width = ARRAY_FORMATS[entry.kind]
+        chars = self._data(entry)
+        if entry.kind not in ARRAY_DTYPES and entry.kind != 'L':
+            return chars.tobytes().decode().strip()
+        if len(chars) != entry.count * width:
+            raise FileFormatError(self.filename, None,
+                                  '{}: expected {} values, found {}'.format(
+                                      name, entry.count, len(chars) // width))
+        if entry.kind == 'L':
+            return chars == ord('T')
+        try:
+            if entry.kind == 'R':
+                return parse_reals(chars.reshape(-1, width))
+            return chars.view('S{}'.format(width)).astype(ARRAY_DTYPES[entry.kind])
+        except ValueError as e:
+            raise FileFormatError(self.filename, None, '{}: {}'.format(name, e))
+
+    def __getitem__(self, name):
+        if name not in self._values:
+            LOG.debug('Reading %s from %s', name, self.filename)
+            self._values[name] = self._array(name, self._index[name])
+        return self._values[name]
+
+    def get(self, name, default=None):
+        if name not in self._index:
+            return default
+        return self[name]
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def keys(self):
+        return self._index.keys()
+
+    @property
+    def geometry(self):
+        """The current geometry"""
+        from ..geometry import Geometry
+        return Geometry.from_atomic_numbers(
+            self['Atomic numbers'], self['Current cartesian coordinates'],
+            units='bohr', charge=self.get('Charge', 0),
+            multiplicity=self.get('Multiplicity', 1))
+
+    @property
+    def scf_energy(self):
+        return self.get('SCF Energy')
+
+    @property
+    def total_energy(self):
+        return self.get('Total Energy')
+
+    @property
+    def number_of_basis_functions(self):
+        return self['Number of basis functions']
+
+    def mo_coefficients(self, spin='alpha'):
+        """The MO coefficients (MOs x basis functions) of spin
+        (alpha or beta), or None for beta of restricted wavefunctions"""
+        coefficients = self.get('{} MO coefficients'.format(spin.capitalize()))
+        if coefficients is None:
+            return None
+        return coefficients.reshape(-1, self.number_of_basis_functions)
+
+    def mo_energies(self, spin='alpha'):
+        return self.get('{} Orbital Energies'.format(spin.capitalize()))
+
+    def density_matrix(self, name='Total SCF Density'):
+        """The full symmetric density matrix from its lower triangle"""
+        n = self.number_of_basis_functions
+        density = np.zeros((n, n))
+        density[np.tril_indices(n)] = self[name]
+        return density + np.tril(density, -1).T
+
+    @property
+    def basis_shells(self):
+        """The shell arrays describing the basis set"""
+        names = ('Shell types', 'Number of primitives per shell',
+                 'Shell to atom map', 'Primitive exponents', 'Contraction coefficients',
+                 'P(S=P) Contraction coefficients', 'Coordinates of each shell')
+        return {name: self[name] for name in names if name in self}
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __str__(self):
+        return "FchkFile: {} ({} {}/{})".format(self.filename, self.job_type,
+                                               self.method, self.basis_set)
@@ -10,6 +10,8 @@ from collections import defaultdict
 HF_REGEX = re.compile(r'\\\s*H\s*F\s*=\s*([^\\]*)\\')
 MP2_REGEX = re.compile(r'\\\s*M\s*\s*P\s*\s*2\s*=\s*([^\\]*)\\')
 CONVERGENCE_FAIL_STRING = '>>>>>>>>>> Convergence criterion not met'
+TERMINATION_STRINGS = (' Normal termination of Gaussian', ' Error termination')
+ARCHIVE_START = ' 1\\1\\'
 
 LOG = logging.getLogger(__name__)
 
@@ -30,11 +32,73 @@ class G09LogFile:
 
         with path.open('r') as log_file:
             self._contents = log_file.readlines()
+
+    @classmethod
+    def from_lines(cls, lines, filename='lines'):
+        """Construct a log file object from already read lines"""
+        log_file = cls.__new__(cls)
+        log_file._filename = filename
+        log_file._contents = lines
+        return log_file
+
+    @classmethod
+    def summary(cls, path):
+        """Read only the lines of the log at path needed for energies,
+        convergence and spin components (SCF Done lines, convergence
+        failures, spin components, archive entries and termination
+        lines), so memory use does not grow with the length of the log.
+        scf_convergence is not available from a summary."""
+        if not isinstance(path, Path):
+            path = Path(path)
+        lines = []
+        following = 0
+        in_archive = False
+        with path.open('r') as log_file:
+            for line in log_file:
+                if following:
+                    lines.append(line)
+                    following -= 1
+                elif in_archive or line.startswith(ARCHIVE_START):
+                    lines.append(line)
+                    in_archive = bool(line.strip()) and not line.rstrip().endswith('@')
+                elif line.startswith((' SCF Done',) + TERMINATION_STRINGS) or \
+                        CONVERGENCE_FAIL_STRING in line:
+                    lines.append(line)
+                elif line.strip().startswith('Spin components'):
+                    lines.append(line)
+                    following = 3
+        return cls.from_lines(lines, filename=path.name)
+
     @property
     def contents(self):
         """Return the contents of this file as lines"""
         return self._contents
 
+    @property
+    def steps(self):
+        """Split a multi-step (--Link1--) log into one G09LogFile per
+        step, each ending at its termination line. Any trailing lines
+        after the final termination (e.g. a step still running) form
+        the last step."""
+        steps = []
+        start = 0
+        for i, line in enumerate(self.contents, 1):
+            if line.startswith(TERMINATION_STRINGS):
+                steps.append(self.contents[start:i])
+                start = i
+        if any(line.strip() for line in self.contents[start:]):
+            steps.append(self.contents[start:])
+        if len(steps) < 2:
+            return [self]
+        return [G09LogFile.from_lines(lines, filename='{}[{}]'.format(self._filename, n))
+                for n, lines in enumerate(steps)]
+
+    @property
+    def final_step(self):
+        """The last step of a multi-step log, e.g. the large basis
+        calculation after a guess=read basis set ladder"""
+        return self.steps[-1]
+
     @property
     def scf_energy(self):
         """Return the SCF energy of this calculation,
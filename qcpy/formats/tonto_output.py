@@ -1,30 +1,112 @@
+from collections import deque
 from pathlib import Path
+import errno
 import logging
+import os
 from . import FileFormatError, LineFormatError
 import re
 
 LOG = logging.getLogger(__name__)
 
+KEY_VALUE_REGEX = re.compile(r'(.*)\s\.+\s(.*)')
+NUMBER_REGEX = re.compile(r'[-+]?(\d+\.?\d*|\.\d+)([eEdD][-+]?\d+)?$')
+SCF_ENERGY_KEYS = ('scf energy', 'total energy', 'energy')
+
+
+def is_banner(line):
+    """Is line one of the ===== lines above and below section titles?"""
+    stripped = line.strip()
+    return bool(stripped) and not stripped.strip('=')
+
+
+def parse_value(value):
+    """value as an int or float if it is a number (with a Fortran
+    D exponent or not), otherwise unchanged
+
+    >>> parse_value('-0.7609D+02')
+    -76.09
+    >>> parse_value('23'), parse_value('rhf')
+    (23, 'rhf')
+    """
+    if not NUMBER_REGEX.match(value):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return float(value.replace('D', 'e').replace('d', 'e'))
+
+
 class TontoOutputFile:
-    """Object for a tonto output file, constructed from a filename or a pathlib.Path object"""
+    """Object for a tonto output file, constructed from a filename or a pathlib.Path object.
+    Sections (titles between ===== banners, followed by 'key ..... value'
+    lines) are parsed while reading the file line by line, so only the
+    sections asked for are parsed, and the file is never held whole."""
     _filename = ""
-    _contents = []
+    _contents = None
     _scf_energy = None
+    _scf_energy_read = False
     _data = None
 
     def __init__(self, path):
         if not isinstance(path, Path):
             path = Path(path)
+        if not path.is_file():
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), str(path))
+        self._path = path
         self._filename = path.name
 
-        with path.open('r') as stdout_file:
-            self._contents = stdout_file.readlines()
-
     @property
     def contents(self):
         """Return the contents of this file as lines"""
+        if self._contents is None:
+            with self._path.open('r') as stdout_file:
+                self._contents = stdout_file.readlines()
         return self._contents
 
+    def sections(self, names=None, *, typed=False):
+        """Yield (title, {key: value}) for each section of the output,
+        or only those with titles in names, as they are read. A section
+        ends at the next line containing '='. With typed set, numeric
+        values are converted to int or float."""
+        if names is not None:
+            names = set(names)
+        with self._path.open('r') as stdout_file:
+            yield from self._sections(stdout_file, names, typed)
+
+    @staticmethod
+    def _sections(lines, names, typed):
+        previous = deque(maxlen=2)
+        title = data = None
+        wanted = False
+        for line in lines:
+            if data is not None:
+                if '=' not in line:
+                    if wanted:
+                        match = KEY_VALUE_REGEX.match(line)
+                        if match and match.group(2):
+                            value = match.group(2).strip()
+                            data[match.group(1).strip()] = parse_value(value) if typed else value
+                    continue
+                if wanted:
+                    yield title, data
+                data = None
+            if is_banner(line) and len(previous) == 2 and is_banner(previous[0]):
+                title = previous[1].rstrip('\r\n')
+                wanted = names is None or title in names
+                data = {}
+                previous.clear()
+                continue
+            previous.append(line)
+        if data is not None and wanted:
+            yield title, data
+
+    def section(self, name, *, typed=True):
+        """The first section titled name, stopping reading there,
+        or None if there is no such section"""
+        for _, data in self.sections([name], typed=typed):
+            return data
+        return None
+
     @property
     def structured_contents(self):
         """Return the structured data parsed from this file"""
@@ -32,21 +114,18 @@ class TontoOutputFile:
             self._parse()
         return self._data
 
-    def _get_sections(self):
-        string = ''.join(self.contents)
-        sections = re.findall(r"=+\n([^\r\n]*)\n=+([^=]*)", string)
-        section_data = {}
-        for section in sections:
-            section_data[section[0]] = self._parse_section(section[1].strip())
-        self._data = section_data
-
-    def _parse_section(self, string):
-        return dict(re.findall('(.*)\s\.+\s(.*)', string))
+    @property
+    def scf_energy(self):
+        """The SCF energy from the last section reporting one"""
+        if not self._scf_energy_read:
+            for _, data in self.sections(typed=True):
+                lower = {k.lower(): v for k, v in data.items()}
+                for key in SCF_ENERGY_KEYS:
+                    if isinstance(lower.get(key), float):
+                        self._scf_energy = lower[key]
+                        break
+            self._scf_energy_read = True
+        return self._scf_energy
 
     def _parse(self):
-        self._get_sections()
-        self._cleanup_structured_data()
-
-    def _cleanup_structured_data(self):
-        for section, contents in self._data.items():
-            self._data[section] = dict((k, v.strip()) for k, v in contents.items() if v)
+        self._data = dict(self.sections())
@@ -52,6 +52,18 @@ class Geometry:
                         multiplicity=xyz.multiplicity,
                         comment=xyz.comment)
 
+    @staticmethod
+    def from_atomic_numbers(numbers, positions, *, units='angstrom', **kwargs):
+        """Create a geometry from atomic numbers and an (N, 3) array
+        of positions in units (angstrom or bohr), e.g. as read from
+        fchk or cube files. Other keyword arguments are passed on."""
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        if units == 'bohr':
+            positions = positions * Bohr
+        atoms = [Atom.from_number_and_location(int(n), p)
+                 for n, p in zip(numbers, positions)]
+        return Geometry(atoms, **kwargs)
+
     @property
     def elements(self) -> List[Element]:
         """Returns a list of the elements in this geometry"""
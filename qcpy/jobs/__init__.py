@@ -1,7 +1,7 @@
 """Module encapsulating all of the job types, as well as runners"""
 from .gaussian import GaussianJob
 from .tonto import TontoJob
-from .job import Job, InputFileJob
+from .job import Job, InputFileJob, BundledInputJob
 
 __all__ = [
     "gaussian",
@@ -2,6 +2,8 @@
 All gaussian (g09) job classes
 """
 import logging
+from collections import ChainMap
+from collections.abc import MutableMapping
 from ..templates import GaussianSCF as SCF
 from ..formats.gaussian import G09LogFile
 from .job import GeometryJob, InputFileJob
@@ -10,6 +12,10 @@ import os
 LOG = logging.getLogger(__name__)
 
 D3BJ = 'EmpiricalDispersion=GD3BJ'
+LINK1 = '--Link1--\n'
+SCF_ROUTE = ('#p {method.method}/{basis} {method.additional}{guess} '
+             'scf=(conver=8,maxconventionalcycles=555,xqc)\n')
+LINK0 = (('mem', '%mem={}\n'), ('nprocs', '%nproc={}\n'), ('chkfile', '%chk={}\n'))
 
 
 
@@ -66,51 +72,125 @@ double_hybrids = [
     'mpw2plyp', 'dsdpbep86', 'pbe0dh', 'pbeq1dh'
 ]
 
-available_methods = {
-    'b2gpplyp': G09method('b2plyp', 'iop(3/125=0360003600,3/78=0640006400,'
-                                      '3/76=0350006500,3/77=1000010000,5/33=1,3/124=-040)'),
-    'b2kplyp': G09method('b2plyp',
-                           'iop(3/125=0420004200,3/76=0280007200,'
-                           '3/78=0580005800,3/77=1000010000,5/33=1)'),
-    'b2tplyp': G09method('b2plyp', 
-                           'iop(3/125=0310003100,3/76=0400006000,'
-                           '3/78=0690006900,3/77=1000010000,5/33=1)'),
-    'dsd-blyp': G09method('b2plyp',
-                            'iop(3/125=0400004600,3/76=0300007000,'
-                            '3/78=0560005600,3/77=1000010000,5/33=1)'),
-    'dsd-pbep86': G09method('b2plyp',
-                              'iop(3/125=0250005300,3/76=0300007000,'
-                              '3/78=0430004300,3/74=1004,5/33=1)'),
-    'hf': G09method('hf'),
-    'mp2': G09method('mp2', includes_dispersion=True),
-    'mpw1b95': G09method('mpwb95', 'iop(3/76=0690003100)'),
-    'mpwb1k': G09method('mpwb95', 'iop(3/76=0560004400)'),
-    'pbe38': G09method('pbepbe', 'iop(3/76=06250003750)'), # check this
-    'pbesol': G09method('pbepbe', 'iop(3/74=5050)'), #
-    'scs-mp2': G09method('mp2', redundancy='mp2', includes_dispersion=True,
-                           correction={'a': 1.200, 'b': 0.333}),
-    'sos-mp2': G09method('mp2', redundancy='mp2', includes_dispersion=True,
-                           correction={'a': 1.300, 'b': 0.000}),
-    'scs(mi)-mp2': G09method('mp2', redundancy='mp2', includes_dispersion=True,
-                               correction={'a': 0.400, 'b': 1.290}),
-    'scsn-mp2': G09method('mp2', redundancy='mp2', includes_dispersion=True,
-                            correction={'a': 0.000, 'b': 1.760}),
-    'scs-mp2-vdw': G09method('mp2', redundancy='mp2', includes_dispersion=True,
-                               correction={'a': 1.280, 'b': 0.500}),
-    's2-mp': G09method('mp2', redundancy='mp2', includes_dispersion=True,
-                         correction={'a': 1.150, 'b': 0.750}),
-}
-
-for x in exchange_functionals:
-    for c in correlation_functionals:
-        available_methods[x+c] = G09method(x+c)
-
-for xc in pure_functionals + hybrids + rs_hybrids + double_hybrids:
-    available_methods[xc] = G09method(xc)
+
+def _build_methods():
+    """All methods by name; built on first access of available_methods,
+    rather than on import"""
+    methods = {
+        'b2gpplyp': G09method('b2plyp', 'iop(3/125=0360003600,3/78=0640006400,'
+                                          '3/76=0350006500,3/77=1000010000,5/33=1,3/124=-040)'),
+        'b2kplyp': G09method('b2plyp',
+                               'iop(3/125=0420004200,3/76=0280007200,'
+                               '3/78=0580005800,3/77=1000010000,5/33=1)'),
+        'b2tplyp': G09method('b2plyp', 
+                               'iop(3/125=0310003100,3/76=0400006000,'
+                               '3/78=0690006900,3/77=1000010000,5/33=1)'),
+        'dsd-blyp': G09method('b2plyp',
+                                'iop(3/125=0400004600,3/76=0300007000,'
+                                '3/78=0560005600,3/77=1000010000,5/33=1)'),
+        'dsd-pbep86': G09method('b2plyp',
+                                  'iop(3/125=0250005300,3/76=0300007000,'
+                                  '3/78=0430004300,3/74=1004,5/33=1)'),
+        'hf': G09method('hf'),
+        'mp2': G09method('mp2', includes_dispersion=True),
+        'mpw1b95': G09method('mpwb95', 'iop(3/76=0690003100)'),
+        'mpwb1k': G09method('mpwb95', 'iop(3/76=0560004400)'),
+        'pbe38': G09method('pbepbe', 'iop(3/76=06250003750)'), # check this
+        'pbesol': G09method('pbepbe', 'iop(3/74=5050)'), #
+        'scs-mp2': G09method('mp2', redundancy='mp2', includes_dispersion=True,
+                               correction={'a': 1.200, 'b': 0.333}),
+        'sos-mp2': G09method('mp2', redundancy='mp2', includes_dispersion=True,
+                               correction={'a': 1.300, 'b': 0.000}),
+        'scs(mi)-mp2': G09method('mp2', redundancy='mp2', includes_dispersion=True,
+                                   correction={'a': 0.400, 'b': 1.290}),
+        'scsn-mp2': G09method('mp2', redundancy='mp2', includes_dispersion=True,
+                                correction={'a': 0.000, 'b': 1.760}),
+        'scs-mp2-vdw': G09method('mp2', redundancy='mp2', includes_dispersion=True,
+                                   correction={'a': 1.280, 'b': 0.500}),
+        's2-mp': G09method('mp2', redundancy='mp2', includes_dispersion=True,
+                             correction={'a': 1.150, 'b': 0.750}),
+    }
+
+    for x in exchange_functionals:
+        for c in correlation_functionals:
+            methods[x+c] = G09method(x+c)
+
+    for xc in pure_functionals + hybrids + rs_hybrids + double_hybrids:
+        methods[xc] = G09method(xc)
+    return methods
+
+
+class MethodRegistry(MutableMapping):
+    """The methods by name, built on first use rather than on import.
+    Methods may be added (e.g. spin component scaled variants)."""
+    _methods = None
+
+    @property
+    def methods(self):
+        if self._methods is None:
+            self._methods = _build_methods()
+        return self._methods
+
+    def __getitem__(self, name):
+        return self.methods[name]
+
+    def __setitem__(self, name, method):
+        self.methods[name] = method
+
+    def __delitem__(self, name):
+        del self.methods[name]
+
+    def __contains__(self, name):
+        return name in self.methods
+
+    def __iter__(self):
+        return iter(self.methods)
+
+    def __len__(self):
+        return len(self.methods)
+
+
+available_methods = MethodRegistry()
+
+
+def geometry_block(geometry):
+    """The g09 formatted atom lines for geometry as a single string.
+    Pass this as the geometry_block parameter of each GaussianJob
+    sharing a geometry, so it is only formatted once."""
+    return '\n'.join(geometry.as_lines(line_format="g09"))
+
+
+def _render_scf_step(params, basis, block, guess='', title=None):
+    link0 = ''.join(fmt.format(params[key]) for key, fmt in LINK0 if params.get(key))
+    geometry = params['geometry']
+    return ''.join((
+        link0,
+        SCF_ROUTE.format(method=params['method'], basis=basis, guess=guess),
+        '\n', params['name'] if title is None else title, '\n\n',
+        '{} {}'.format(geometry.charge, geometry.multiplicity),
+        '\n' if block else '', block, '\n\n'
+    ))
+
+
+def _render_scf(params):
+    """Render the gaussian_scf template without jinja, giving
+    identical output."""
+    block = params.get('geometry_block')
+    if block is None:
+        block = geometry_block(params['geometry'])
+    if params.get('guess_basis_set'):
+        return ''.join((
+            _render_scf_step(params, params['guess_basis_set'], block,
+                             title=params['name'] + ' (guess)'),
+            LINK1,
+            _render_scf_step(params, params['basis_set'], block, guess=' guess=read')
+        ))
+    return _render_scf_step(params, params['basis_set'], block)
+
 
 class GaussianJob(GeometryJob, InputFileJob):
     """Base class for all g09 jobs"""
-    params = {
+    _defaults = {
         'kind': 'scf',
         'basis_set': '6-31G',
         'method': 'hf',
@@ -138,12 +218,15 @@ class GaussianJob(GeometryJob, InputFileJob):
     _input_file = 'input.gjf'
 
     def __init__(self, **kwargs):
-        self.params.update(kwargs)
+        # per job parameters overlay the (never modified) defaults,
+        # so nothing is copied or shared between jobs
+        self.params = ChainMap(kwargs, self._defaults)
         method = self.params['method'].lower()
 
         if not method in available_methods:
             raise(UnknownmethodError(self.params['method']))
         else:
+            self._method_name = method
             self.params['method'] = available_methods[method]
 
         if not 'geometry' in self.params:
@@ -162,7 +245,7 @@ class GaussianJob(GeometryJob, InputFileJob):
     @property
     def default_basename(self):
         """Get the default basename for this job e.g. h2o_b3lyp_sto3g"""
-        return "{}_{}_{}".format(self._name, self._method, self._basis_set_name)
+        return "{}_{}_{}".format(self._name, self._method_name, self.basis_set)
 
     def resolve_dependencies(self):
         LOG.debug("Resolving dependences for %s", self.name)
@@ -181,7 +264,12 @@ class GaussianJob(GeometryJob, InputFileJob):
         raise NotImplementedError
 
     def render(self):
-        return self.params['template'].render(**self.params)
+        params = self.params
+        if params.get('guess_basis_set') and not params.get('chkfile'):
+            params = dict(params, chkfile=self.chkfile)
+        if params['template'] is SCF:
+            return _render_scf(params)
+        return params['template'].render(**params)
 
     @property
     def basis_set(self):
@@ -193,3 +281,25 @@ class GaussianJob(GeometryJob, InputFileJob):
     @property
     def method(self):
         return self.params['method']
+
+    @property
+    def guess_basis_set(self):
+        """The basis set of the step whose checkpoint is read as
+        the initial guess, or None"""
+        return self.params.get('guess_basis_set')
+
+    @property
+    def chkfile(self):
+        """The checkpoint file for this job. Basis set ladders
+        default to one named after the job, so the large basis
+        step can read the guess written by the small basis step"""
+        chkfile = self.params.get('chkfile')
+        if not chkfile and self.guess_basis_set:
+            chkfile = self.default_basename + '.chk'
+        return chkfile
+
+
+def link1_input(jobs):
+    """Join the rendered inputs of several jobs into one multi-step
+    input, run one after the other by a single g09 process"""
+    return LINK1.join(job.render() for job in jobs)
@@ -2,8 +2,10 @@
 Abstract base classes for Jobs
 """
 import logging
+import os
 
 from ..templates import EmptyTemplate
+from ..formats.bundle import InputBundle
 
 class InvalidBasisSetName(Exception):
     pass
@@ -19,9 +21,12 @@ class Job(object):
     _working_directory = None
     _requires_shell = False
     _capture_stdout = False
+    _stdout_filename = None
+    _stdout_path = None
     _stdout = ""
     _stderr = ""
     _result = None
+    _priority = 0
 
     def set_working_directory(self, dirname: str):
         """"Set the working directory for this job"""
@@ -39,9 +44,29 @@ class Job(object):
 
     @property
     def stdout(self) -> str:
-        """Return the output to stdout for this job"""
+        """Return the output to stdout for this job, read from
+        stdout_path if it was captured to a file"""
+        if self._stdout_path is not None:
+            with open(self._stdout_path) as f:
+                return f.read()
         return self._stdout
 
+    @property
+    def stdout_filename(self) -> str:
+        """The name of the file in the working directory that
+        captured stdout is written to, by default <name>.stdout"""
+        return self._stdout_filename or self.name + '.stdout'
+
+    @property
+    def stdout_path(self):
+        """The path of the file stdout was captured to, or None"""
+        return self._stdout_path
+
+    def stdout_parser(self):
+        """A callable fed each line of stdout as it is captured,
+        or None to have stdout written straight to its file"""
+        return None
+
     @property
     def capture_stdout(self) -> bool:
         """Should this job capture what is written to stdout?"""
@@ -76,6 +101,16 @@ class Job(object):
         """ Change the name of the job. """
         self._name = name
 
+    @property
+    def priority(self) -> int:
+        """ Jobs with higher priority are run first by runners
+        using a priority queue. """
+        return self._priority
+
+    def set_priority(self, priority: int):
+        """ Change the priority of the job. """
+        self._priority = priority
+
     def __str__(self):
         return "{}: {}".format(self.__class__.__name__, self.name)
 
@@ -131,3 +166,43 @@ class GeometryJob(Job):
 
     def post_process(self):
         pass
+
+
+class BundledInputJob(InputFileJob):
+    """ Job running a program on an input file stored in an
+    InputBundle. The input is only extracted when resolving
+    dependencies, into whichever directory the job is run in
+    (e.g. a runner's scratch directory). """
+    _command = 'g09'
+
+    def __init__(self, bundle_path, input_name, *, command=None, name=None):
+        # the job is run from its working directory, so the bundle
+        # path must not be relative to the current one
+        self._bundle_path = os.path.abspath(str(bundle_path))
+        self._input_name = input_name
+        self._input_filename = os.path.basename(input_name)
+        self._name = name or os.path.splitext(self._input_filename)[0]
+        if command is not None:
+            self._command = command
+
+    @classmethod
+    def from_bundle(cls, bundle_path, *, root='.', prefix='', **kwargs):
+        """ Lazily yield a job for each input in the bundle (starting with
+        prefix), working in the corresponding subdirectory of root
+        e.g. the job for 'b3lyp/h2o.gjf' works in root/b3lyp """
+        with InputBundle(bundle_path) as bundle:
+            names = bundle.names(prefix)
+        for input_name in names:
+            job = cls(bundle_path, input_name, **kwargs)
+            job.set_working_directory(
+                os.path.join(root, os.path.dirname(input_name)))
+            yield job
+
+    @property
+    def command(self):
+        return [self._command, self.input_filename]
+
+    def resolve_dependencies(self):
+        LOG.debug("Extracting %s from %s", self._input_name, self._bundle_path)
+        with InputBundle(self._bundle_path) as bundle:
+            bundle.extract(self._input_name)
@@ -1,6 +1,7 @@
 import logging
 from .nullrunner import NullRunner
 from .localrunner import LocalRunner
+from .tracing import ChromeTraceExporter, RunnerEvent
 log = logging.getLogger(__name__)
 
 
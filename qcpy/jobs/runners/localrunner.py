@@ -1,35 +1,135 @@
 """
 Run jobs on a local machine
 """
+import fnmatch
 import logging
+import os
+import shutil
 import subprocess
+import tempfile
 
 from ...utils import working_directory
 
 from .nullrunner import NullRunner
+from .tracing import (
+    RESOLVE_DEPENDENCIES_START, RESOLVE_DEPENDENCIES_END,
+    SUBPROCESS_START, SUBPROCESS_END,
+    POST_PROCESS_START, POST_PROCESS_END
+)
 
 LOG = logging.getLogger(__name__)
 
 
+def _copy_matching(source, destination, patterns):
+    """Copy the regular files in source matching any of the glob
+    patterns into destination, returning the names copied"""
+    copied = []
+    with os.scandir(source) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            if any(fnmatch.fnmatch(entry.name, p) for p in patterns):
+                shutil.copy2(entry.path, os.path.join(destination, entry.name))
+                copied.append(entry.name)
+    return copied
+
+
+def _run_captured(command, path, parser, kwargs):
+    """Run command writing its stdout to path, feeding each line
+    to parser as it arrives if one is given. Returns the exit code,
+    raising CalledProcessError if it is not 0"""
+    with open(path, 'w') as stdout_file:
+        if parser is None:
+            return subprocess.run(command, stdout=stdout_file, check=True,
+                                  **kwargs).returncode
+        with subprocess.Popen(command, stdout=subprocess.PIPE, **kwargs) as process:
+            for line in process.stdout:
+                stdout_file.write(line)
+                parser(line)
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command)
+    return process.returncode
+
+
 class LocalRunner(NullRunner):
-    """ Currently totally sequential """
+    """ Currently totally sequential
+
+    If scratch_directory is set (e.g. '/tmp' or a local NVMe mount)
+    each job is run in its own temporary directory there, with
+    GAUSS_SCRDIR pointing to it. Files in the job's working directory
+    matching stage_in are copied to scratch before the job runs, and
+    files matching stage_out (plus checkpoint files if keep_checkpoint)
+    are copied back afterwards. Scratch is always removed, whether or
+    not the job succeeded.
+
+    The stdout of jobs capturing it is written to job.stdout_filename in
+    the job's working directory (never scratch) as the job runs, passing
+    through the job's stdout_parser if it has one, rather than being
+    held in memory.
+    """
     create_working_directories = True
 
+    def __init__(self, jobs=None, *, scratch_directory=None,
+                 stage_in=('*.gjf', '*.com', '*.chk'),
+                 stage_out=('*.log',), keep_checkpoint=False, **kwargs):
+        super().__init__(jobs, **kwargs)
+        self.scratch_directory = scratch_directory
+        self.stage_in = tuple(stage_in)
+        self.stage_out = tuple(stage_out)
+        if keep_checkpoint:
+            self.stage_out += ('*.chk',)
+
     def run_job(self, job):
         LOG.debug('Starting %s', job.name)
-        with working_directory(job.working_directory, create=True):
-            kwargs = {
-                'shell': job._requires_shell,
-                'universal_newlines': True,
-                'check': True,
-            }
+        if self.scratch_directory is None:
+            with working_directory(job.working_directory, create=True):
+                return self._run(job, stdout_directory=os.getcwd())
+
+        destination = os.path.abspath(
+            os.path.expanduser(job.working_directory or os.getcwd()))
+        os.makedirs(destination, exist_ok=True)
+        scratch = tempfile.mkdtemp(prefix='qcpy-',
+                                   dir=os.path.expanduser(self.scratch_directory))
+        LOG.debug('Using scratch directory %s for %s', scratch, job.name)
+        try:
+            _copy_matching(destination, scratch, self.stage_in)
+            env = dict(os.environ, GAUSS_SCRDIR=scratch)
+            with working_directory(scratch):
+                try:
+                    return self._run(job, env=env, stdout_directory=destination)
+                finally:
+                    staged = _copy_matching(scratch, destination, self.stage_out)
+                    LOG.debug('Staged %s back to %s', staged, destination)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def _run(self, job, env=None, stdout_directory=None):
+        kwargs = {
+            'shell': job._requires_shell,
+            'universal_newlines': True,
+        }
+        if env is not None:
+            kwargs['env'] = env
 
+        if job.has_dependencies:
+            self.emit(RESOLVE_DEPENDENCIES_START, job)
+            job.resolve_dependencies()
+            self.emit(RESOLVE_DEPENDENCIES_END, job)
+        self.emit(SUBPROCESS_START, job)
+        try:
             if job.capture_stdout:
-                kwargs['stdout'] = subprocess.PIPE
-            if job.has_dependencies:
-                job.resolve_dependencies()
-            completed = subprocess.run(job.command, **kwargs)
-            job._stdout = completed.stdout if job.capture_stdout else ""
-            if job.requires_postprocessing:
+                job._stdout_path = os.path.join(stdout_directory or os.getcwd(),
+                                                job.stdout_filename)
+                returncode = _run_captured(job.command, job._stdout_path,
+                                           job.stdout_parser(), kwargs)
+            else:
+                returncode = subprocess.run(job.command, check=True, **kwargs).returncode
+        finally:
+            self.emit(SUBPROCESS_END, job)
+        if job.requires_postprocessing:
+            self.emit(POST_PROCESS_START, job)
+            try:
                 job.post_process()
-        return completed.returncode == 0
+            finally:
+                self.emit(POST_PROCESS_END, job)
+        return returncode == 0
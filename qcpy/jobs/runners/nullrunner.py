@@ -1,31 +1,93 @@
 from collections import deque
+import heapq
+import itertools
 import logging
+import time
+
+from .tracing import (
+    RunnerEvent, QUEUED, COMPLETE,
+    RESOLVE_DEPENDENCIES_START, RESOLVE_DEPENDENCIES_END
+)
 
 log = logging.getLogger(__name__)
 
 
 class NullRunner(object):
     """ Do nothing for each job, returning True
-    for job success status. """
-    _jobs = deque()
+    for job success status.
+
+    Jobs may be given as any iterable (e.g. a generator), which is
+    only consumed as the queue drains: at most lookahead jobs are
+    held in the queue at once. If priority is set the queue is
+    ordered by job priority (highest first, then in submission
+    order) within that lookahead window. """
+    default_lookahead = 128
+
+    def __init__(self, jobs=None, *, hooks=None, lookahead=None, priority=False):
+        self._hooks = list(hooks) if hooks else []
+        self.lookahead = lookahead or self.default_lookahead
+        self.priority = priority
+        self._jobs = [] if priority else deque()
+        self._sources = deque()
+        self._counter = itertools.count()
+        if jobs is not None:
+            self.add_jobs(jobs)
+
+    def add_hook(self, callback):
+        """ Register callback to be called with a RunnerEvent
+        at each point in the job lifecycle. """
+        self._hooks.append(callback)
+
+    def remove_hook(self, callback):
+        self._hooks.remove(callback)
+
+    def emit(self, kind, job, **info):
+        """ Notify all hooks of an event, doing nothing if there
+        are no hooks registered. """
+        if self._hooks:
+            event = RunnerEvent(kind, job, time.perf_counter(), info)
+            for hook in self._hooks:
+                hook(event)
 
     def add_job(self, job):
         log.debug("Adding {} to job queue.".format(job.name))
-        self._jobs.append(job)
+        if self.priority:
+            heapq.heappush(self._jobs, (-job.priority, next(self._counter), job))
+        else:
+            self._jobs.append(job)
+        self.emit(QUEUED, job)
 
     def add_jobs(self, jobs):
-        for job in jobs:
-            self.add_job(job)
+        """ Lazily add all jobs from an iterable, pulling from it
+        only as the queue needs refilling. """
+        self._sources.append(iter(jobs))
+
+    def _fill(self):
+        while self._sources and len(self._jobs) < self.lookahead:
+            try:
+                self.add_job(next(self._sources[0]))
+            except StopIteration:
+                self._sources.popleft()
+
+    def _next_job(self):
+        if self.priority:
+            return heapq.heappop(self._jobs)[-1]
+        return self._jobs.popleft()
 
     def run_job(self, job):
         return True
 
     def run(self, resolve_dependencies=False):
         log.debug("Running all jobs in job queue.")
+        self._fill()
         while self._jobs:
-            job = self._jobs.popleft()
+            job = self._next_job()
+            self._fill()
             log.debug("Starting {}".format(job.name))
             if resolve_dependencies and job.has_dependencies:
+                self.emit(RESOLVE_DEPENDENCIES_START, job)
                 job.resolve_dependencies()
+                self.emit(RESOLVE_DEPENDENCIES_END, job)
             success = self.run_job(job)
+            self.emit(COMPLETE, job, success=success)
             yield (job, success)
@@ -0,0 +1,98 @@
+"""
+Lifecycle event hooks for runners, and an exporter writing
+them as a Chrome trace (chrome://tracing or ui.perfetto.dev)
+JSON timeline.
+"""
+from collections import namedtuple
+import json
+import logging
+import os
+import threading
+
+LOG = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RESOLVE_DEPENDENCIES_START = 'resolve_dependencies_start'
+RESOLVE_DEPENDENCIES_END = 'resolve_dependencies_end'
+SUBPROCESS_START = 'subprocess_start'
+SUBPROCESS_END = 'subprocess_end'
+POST_PROCESS_START = 'post_process_start'
+POST_PROCESS_END = 'post_process_end'
+COMPLETE = 'complete'
+
+EVENTS = (
+    QUEUED,
+    RESOLVE_DEPENDENCIES_START, RESOLVE_DEPENDENCIES_END,
+    SUBPROCESS_START, SUBPROCESS_END,
+    POST_PROCESS_START, POST_PROCESS_END,
+    COMPLETE,
+)
+
+RunnerEvent = namedtuple('RunnerEvent', 'kind job timestamp info')
+RunnerEvent.__doc__ = """A single lifecycle event emitted by a runner.
+timestamp is from time.perf_counter(), in seconds; info is a dict of
+extra data (e.g. success on completion)."""
+
+
+class ChromeTraceExporter:
+    """Runner hook collecting events into the Chrome trace event format.
+
+    >>> exporter = ChromeTraceExporter()
+    >>> exporter(RunnerEvent(QUEUED, 'job', 0.5, {}))
+    >>> exporter.trace_events[0]['ph'], exporter.trace_events[0]['ts']
+    ('i', 0.0)
+    """
+
+    def __init__(self, filename=None, process_name='qcpy'):
+        self.filename = filename
+        self.process_name = process_name
+        self._origin = None
+        self._events = []
+
+    def __call__(self, event):
+        if self._origin is None:
+            self._origin = event.timestamp
+        kind = event.kind
+        args = {'job': str(getattr(event.job, 'name', event.job))}
+        args.update(event.info)
+        record = {
+            'ts': (event.timestamp - self._origin) * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': args,
+        }
+        if kind.endswith('_start'):
+            record['name'] = kind[:-len('_start')]
+            record['ph'] = 'B'
+        elif kind.endswith('_end'):
+            record['name'] = kind[:-len('_end')]
+            record['ph'] = 'E'
+        else:
+            record['name'] = kind
+            record['ph'] = 'i'
+            record['s'] = 't'
+        self._events.append(record)
+
+    @property
+    def trace_events(self):
+        """The list of trace events collected so far"""
+        return self._events
+
+    def as_dict(self):
+        """Return the trace in the JSON object format"""
+        metadata = {
+            'name': 'process_name', 'ph': 'M', 'pid': os.getpid(),
+            'args': {'name': self.process_name}
+        }
+        return {
+            'traceEvents': [metadata] + self._events,
+            'displayTimeUnit': 'ms',
+        }
+
+    def write(self, filename=None):
+        """Write the trace to filename (or the filename given
+        on construction)"""
+        filename = filename or self.filename
+        LOG.debug('Writing %d trace events to %s', len(self._events), filename)
+        with open(filename, 'w') as trace_file:
+            json.dump(self.as_dict(), trace_file)
@@ -7,19 +7,75 @@ LOG = logging.getLogger(__name__)
 
 
 class TontoKeywords(dict):
-    def as_input_lines(d, prefix=''): 
+    """Tonto keywords, with nested keyword blocks as TontoKeywords.
+    The input lines of each block are cached until it, or a block
+    nested in it, is modified through the dict methods."""
+    _version = 0
+    _lines = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.update(*args, **kwargs)
+
+    def _modified(self):
+        self._version += 1
+
+    def __setitem__(self, key, value):
+        if isinstance(value, dict) and not isinstance(value, TontoKeywords):
+            value = TontoKeywords(value)
+        super().__setitem__(key, value)
+        self._modified()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._modified()
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, *args):
+        self._modified()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._modified()
+        return super().popitem()
+
+    def clear(self):
+        super().clear()
+        self._modified()
+
+    def _state(self):
+        """The versions of this block and those nested in it"""
+        return (self._version,) + tuple(
+            v._state() for v in self.values() if isinstance(v, TontoKeywords))
+
+    def as_input_lines(self, prefix=''):
+        state = self._state()
+        if self._lines is None:
+            self._lines = {}
+        cached = self._lines.get(prefix)
+        if cached is not None and cached[0] == state:
+            return cached[1]
         lines = []
-        for key, value in d.items():
+        for key, value in self.items():
             if value is None:
                 lines.append('{}{}'.format(prefix, key))
+            elif isinstance(value, TontoKeywords):
+                lines.append('{}{}= {{'.format(prefix, key))
+                lines.append(value.as_input_lines(prefix=prefix+'  '))
+                lines.append('{}}}'.format(prefix))
             else:
-                if isinstance(value, dict):
-                    lines.append('{}{}= {{'.format(prefix, key))
-                    lines.append(TontoKeywords(value).as_input_lines(prefix=prefix+'  '))
-                    lines.append('{}}}'.format(prefix))
-                else:
-                    lines.append('{}{}= {}'.format(prefix, key, value))
-        return '\n'.join(lines)
+                lines.append('{}{}= {}'.format(prefix, key, value))
+        text = '\n'.join(lines)
+        self._lines[prefix] = (state, text)
+        return text
 
 
 class TontoJob(GeometryJob, InputFileJob, dict):
@@ -28,6 +84,7 @@ class TontoJob(GeometryJob, InputFileJob, dict):
     _requires_postprocessing = True
     _input_filename = 'stdin'
     _output_filename = 'stdout'
+    _stdout_filename = 'stdout'
 
     _defaults = {
         'kind': 'scf',
@@ -90,13 +147,15 @@ class TontoJob(GeometryJob, InputFileJob, dict):
         return of.structured_contents
 
     def __getattr__(self, name):
-        try:
-            return getattr(self, name)
-        except:
-            return self._defaults.get(name, None)
+        # only called for names that are not attributes: parameters
+        # (including the defaults) are looked up directly, others are None,
+        # except private names, which are never parameters
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self.get(name)
 
     def post_process(self):
-        contents = self.read_output_file(self._output_file)
+        contents = self.read_output_file(self.stdout_path or self._output_file)
         return contents
 
     @property
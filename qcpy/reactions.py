@@ -0,0 +1,122 @@
+"""
+Dense energy matrices and sparse reaction stoichiometry, so that
+reaction energies for every reaction and method come from a single
+(sparse) matrix product
+"""
+import logging
+import numpy as np
+
+LOG = logging.getLogger(__name__)
+
+
+class EnergyMatrix:
+    """A dense matrix of energies with named rows and columns
+    (e.g. systems x methods), NaN where a value is missing
+
+    >>> m = EnergyMatrix.from_dict({'hf': {'h2': -1.1, 'h': -0.5}, 'mp2': {'h2': -1.2}})
+    >>> m.rows, m.columns
+    (['h', 'h2'], ['hf', 'mp2'])
+    >>> m.as_dict(transpose=True)
+    {'hf': {'h': -0.5, 'h2': -1.1}, 'mp2': {'h2': -1.2}}
+    """
+
+    def __init__(self, rows, columns, values):
+        self.rows = list(rows)
+        self.columns = list(columns)
+        self.values = np.asarray(values, dtype=np.float64)
+
+    @staticmethod
+    def from_dict(energies):
+        """Construct from nested dicts {column: {row: energy}}, e.g.
+        {method: {system: energy}} as read from g09 outputs"""
+        columns = sorted(energies)
+        rows = sorted({row for values in energies.values() for row in values})
+        row_index = {row: i for i, row in enumerate(rows)}
+        values = np.full((len(rows), len(columns)), np.nan)
+        for j, column in enumerate(columns):
+            for row, value in energies[column].items():
+                values[row_index[row], j] = value
+        return EnergyMatrix(rows, columns, values)
+
+    @property
+    def mask(self):
+        """Boolean matrix, True where a value is present"""
+        return ~np.isnan(self.values)
+
+    def column(self, name):
+        return self.values[:, self.columns.index(name)]
+
+    def as_dict(self, transpose=False):
+        """Return nested dicts {row: {column: value}} (or
+        {column: {row: value}} if transpose) omitting missing values"""
+        rows, columns, values = self.rows, self.columns, self.values
+        if transpose:
+            rows, columns, values = columns, rows, values.T
+        result = {}
+        for row, row_values in zip(rows, values.tolist()):
+            present = {c: v for c, v in zip(columns, row_values) if v == v}
+            if present:
+                result[row] = present
+        return result
+
+    def __str__(self):
+        return "EnergyMatrix: {} x {}".format(len(self.rows), len(self.columns))
+
+    def __repr__(self):
+        return str(self)
+
+
+class StoichiometryMatrix:
+    """Sparse reactions x systems matrix of stoichiometric coefficients,
+    stored as coordinate arrays (reaction index, system name, coefficient)
+
+    >>> s = StoichiometryMatrix.from_reactions({'r': [('h', -2), ('h2', 1)]})
+    >>> m = EnergyMatrix.from_dict({'hf': {'h2': -1.1, 'h': -0.5}, 'mp2': {'h2': -1.2}})
+    >>> s.dot(m).as_dict()
+    {'r': {'hf': -0.10000000000000009}}
+    """
+
+    def __init__(self, reactions, row_indices, systems, coefficients):
+        self.reactions = list(reactions)
+        self.row_indices = np.asarray(row_indices, dtype=np.intp)
+        self.systems = list(systems)
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+
+    @staticmethod
+    def from_reactions(reactions):
+        """Construct from {reaction: [(system, coefficient), ...]}
+        as returned by read_reactions"""
+        names = sorted(reactions)
+        rows, systems, coefficients = [], [], []
+        for i, reaction in enumerate(names):
+            for system, coefficient in reactions[reaction]:
+                rows.append(i)
+                systems.append(system)
+                coefficients.append(coefficient)
+        return StoichiometryMatrix(names, rows, systems, coefficients)
+
+    @property
+    def shape(self):
+        return len(self.reactions), len(set(self.systems))
+
+    def dot(self, energies):
+        """Reaction energies (reactions x methods) from the matrix of
+        system energies (systems x methods). Any reaction missing an
+        energy for one of its systems is NaN for that method."""
+        row_index = {row: i for i, row in enumerate(energies.rows)}
+        missing_row = len(energies.rows)
+        # a row of NaN for systems with no energies at all
+        padded = np.vstack((energies.values,
+                            np.full((1, len(energies.columns)), np.nan)))
+        columns = np.fromiter((row_index.get(s, missing_row) for s in self.systems),
+                              dtype=np.intp, count=len(self.systems))
+        result = np.zeros((len(self.reactions), len(energies.columns)))
+        np.add.at(result, self.row_indices,
+                  padded[columns] * self.coefficients[:, np.newaxis])
+        return EnergyMatrix(self.reactions, energies.columns, result)
+
+    def __str__(self):
+        return "StoichiometryMatrix: {} x {}".format(*self.shape)
+
+    def __repr__(self):
+        return str(self)
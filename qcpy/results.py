@@ -0,0 +1,195 @@
+"""
+An indexed SQLite store of single point and reaction energies,
+keyed by benchmark, basis set, method and system (or reaction),
+so subsets can be queried without loading everything
+"""
+import logging
+import sqlite3
+
+from .reactions import EnergyMatrix
+from .scs import SpinComponents, SPIN_COMPONENTS
+
+LOG = logging.getLogger(__name__)
+
+ENERGIES = 'energies'
+REACTION_ENERGIES = 'reaction_energies'
+_KEYS = {ENERGIES: 'system', REACTION_ENERGIES: 'reaction'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS energies (
+    benchmark TEXT NOT NULL,
+    basis_set TEXT NOT NULL,
+    method TEXT NOT NULL,
+    system TEXT NOT NULL,
+    energy REAL NOT NULL,
+    PRIMARY KEY (benchmark, basis_set, method, system)
+);
+CREATE TABLE IF NOT EXISTS reaction_energies (
+    benchmark TEXT NOT NULL,
+    basis_set TEXT NOT NULL,
+    method TEXT NOT NULL,
+    reaction TEXT NOT NULL,
+    energy REAL NOT NULL,
+    PRIMARY KEY (benchmark, basis_set, method, reaction)
+);
+CREATE TABLE IF NOT EXISTS spin_components (
+    benchmark TEXT NOT NULL,
+    basis_set TEXT NOT NULL,
+    method TEXT NOT NULL,
+    system TEXT NOT NULL,
+    reference REAL NOT NULL,
+    alpha_alpha REAL NOT NULL,
+    beta_beta REAL NOT NULL,
+    alpha_beta REAL NOT NULL,
+    PRIMARY KEY (benchmark, basis_set, method, system)
+);
+CREATE INDEX IF NOT EXISTS energies_method ON energies (method);
+CREATE INDEX IF NOT EXISTS reaction_energies_method ON reaction_energies (method);
+"""
+
+
+class ResultsStore:
+    """Results store, constructed from a filename or a pathlib.Path
+    object, created if it does not exist.
+
+    >>> with ResultsStore(':memory:') as store:
+    ...     store.add_energies('W4', 'def2svp', [('h2', 'hf', -1.1), ('h', 'hf', -0.5)])
+    ...     store.query(method='hf', system='h2')
+    ...     store.matrix('W4')
+    [('W4', 'def2svp', 'hf', 'h2', -1.1)]
+    EnergyMatrix: 2 x 1
+    """
+
+    def __init__(self, path):
+        self._path = str(path)
+        self._connection = sqlite3.connect(self._path)
+        self._connection.executescript(_SCHEMA)
+
+    @property
+    def path(self):
+        return self._path
+
+    def _add(self, table, benchmark, basis_set, records):
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO {} (benchmark, basis_set, {}, method, energy) '
+            'VALUES (?, ?, ?, ?, ?)'.format(table, _KEYS[table]),
+            ((benchmark, basis_set, key, method, energy)
+             for key, method, energy in records))
+        self._connection.commit()
+
+    def add_energies(self, benchmark, basis_set, records):
+        """Add (system, method, energy) records for a benchmark"""
+        self._add(ENERGIES, benchmark, basis_set, records)
+
+    def add_reaction_energies(self, benchmark, basis_set, records):
+        """Add (reaction, method, energy) records for a benchmark"""
+        self._add(REACTION_ENERGIES, benchmark, basis_set, records)
+
+    def add_spin_components(self, benchmark, basis_set, method, components):
+        """Add the E(2) spin components (a SpinComponents) of the
+        calculations of method for a benchmark, so spin component scaled
+        variants can be evaluated later without reading any logs"""
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO spin_components VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            ((benchmark, basis_set, method, system, reference) + tuple(row)
+             for system, reference, row in zip(components.systems,
+                                               components.reference.tolist(),
+                                               components.components.tolist())))
+        self._connection.commit()
+
+    def spin_components(self, benchmark, method='mp2', *, basis_set=None):
+        """The stored spin components of method for a benchmark"""
+        where, values = self._where(benchmark=benchmark, method=method, basis_set=basis_set)
+        rows = self._connection.execute(
+            'SELECT system, reference, {} FROM spin_components{} ORDER BY system'.format(
+                ', '.join(k.replace('-', '_') for k in SPIN_COMPONENTS), where),
+            values).fetchall()
+        return SpinComponents([r[0] for r in rows], [r[1] for r in rows],
+                              [r[2:] for r in rows])
+
+    def clear(self, benchmark):
+        """Remove all results for a benchmark, e.g. before reprocessing it"""
+        for table in (ENERGIES, REACTION_ENERGIES, 'spin_components'):
+            self._connection.execute(
+                'DELETE FROM {} WHERE benchmark = ?'.format(table), (benchmark,))
+        self._connection.commit()
+
+    def _where(self, **conditions):
+        conditions = {k: v for k, v in conditions.items() if v is not None}
+        clauses = []
+        values = []
+        for column, value in conditions.items():
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                clauses.append('{} IN ({})'.format(column, ', '.join('?' * len(value))))
+                values.extend(value)
+            else:
+                clauses.append('{} = ?'.format(column))
+                values.append(value)
+        if not clauses:
+            return '', values
+        return ' WHERE ' + ' AND '.join(clauses), values
+
+    def query(self, table=ENERGIES, *, benchmark=None, basis_set=None,
+              method=None, system=None, reaction=None):
+        """Return the (benchmark, basis_set, method, system or reaction,
+        energy) rows matching all conditions given. Each condition
+        may be a single value or a list of values."""
+        key = _KEYS[table]
+        where, values = self._where(benchmark=benchmark, basis_set=basis_set,
+                                    method=method, **{key: system or reaction})
+        return self._connection.execute(
+            'SELECT benchmark, basis_set, method, {key}, energy FROM {table}{where} '
+            'ORDER BY benchmark, basis_set, method, {key}'.format(
+                key=key, table=table, where=where), values).fetchall()
+
+    def matrix(self, benchmark, table=ENERGIES, *, basis_set=None, method=None):
+        """Results for a single benchmark as an EnergyMatrix
+        (systems or reactions x methods)"""
+        nested = {}
+        for _, _, method_name, key, energy in self.query(
+                table, benchmark=benchmark, basis_set=basis_set, method=method):
+            nested.setdefault(method_name, {})[key] = energy
+        return EnergyMatrix.from_dict(nested)
+
+    def remove_methods(self, benchmark, methods):
+        """Remove the energies and reaction energies of methods for a benchmark"""
+        if not methods:
+            return
+        where, values = self._where(benchmark=benchmark, method=list(methods))
+        for table in _KEYS:
+            self._connection.execute('DELETE FROM {}{}'.format(table, where), values)
+        self._connection.commit()
+
+    def systems(self, benchmark):
+        """The systems with energies stored for a benchmark"""
+        rows = self._connection.execute(
+            'SELECT DISTINCT system FROM energies WHERE benchmark = ? ORDER BY system',
+            (benchmark,))
+        return [row[0] for row in rows]
+
+    def benchmarks(self):
+        rows = self._connection.execute(
+            'SELECT DISTINCT benchmark FROM energies ORDER BY benchmark')
+        return [row[0] for row in rows]
+
+    def methods(self, benchmark=None):
+        where, values = self._where(benchmark=benchmark)
+        rows = self._connection.execute(
+            'SELECT DISTINCT method FROM energies{} ORDER BY method'.format(where), values)
+        return [row[0] for row in rows]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.commit()
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __str__(self):
+        return "ResultsStore: {}".format(self._path)
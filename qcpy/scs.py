@@ -0,0 +1,90 @@
+"""
+Spin component scaled (SCS) variants of MP2, or of the PT2 part of
+double hybrids, evaluated in bulk from the E(2) spin components of
+existing calculations: for each variant with parameters (a, b)
+
+    E = E(reference) + a * E2(alpha-beta) + b * (E2(alpha-alpha) + E2(beta-beta))
+
+where E(reference) is the SCF energy of the base calculation and the
+E(2) components are as printed in its log.
+"""
+import logging
+import numpy as np
+
+from .jobs.gaussian import available_methods, G09method, UnknownmethodError
+from .reactions import EnergyMatrix
+
+LOG = logging.getLogger(__name__)
+
+# column order of stacked spin components
+SPIN_COMPONENTS = ('alpha-alpha', 'beta-beta', 'alpha-beta')
+
+
+def register_scs_variant(name, *, a, b, base='mp2'):
+    """Register name as a spin component scaled variant of the
+    base method (opposite spin scaled by a, same spin by b), so it is
+    planned, skipped when generating inputs and evaluated when
+    processing outputs like the built in variants"""
+    try:
+        method = available_methods[base]
+    except KeyError:
+        raise UnknownmethodError(base)
+    if method.redundancy is not None:
+        raise UnknownmethodError('{} is itself derived from {}'.format(base, method.redundancy))
+    available_methods[name] = G09method(method.method, method.additional,
+                                        category=method.category, redundancy=base,
+                                        correction={'a': a, 'b': b},
+                                        includes_dispersion=method.includes_dispersion)
+    return available_methods[name]
+
+
+def scs_variants(base='mp2'):
+    """Registered variants of base as {name: (a, b)}
+
+    >>> scs_variants()['sos-mp2']
+    (1.3, 0.0)
+    """
+    return {name: (m.correction['a'], m.correction['b'])
+            for name, m in available_methods.items()
+            if m.redundancy == base and m.correction is not None}
+
+
+def scaling_matrix(variants):
+    """The 3 x len(variants) matrix mapping stacked spin components
+    to the correlation energy of each (a, b) in variants"""
+    parameters = np.array(list(variants), dtype=np.float64).reshape(-1, 2)
+    a, b = parameters[:, 0], parameters[:, 1]
+    return np.stack((b, b, a))
+
+
+class SpinComponents:
+    """Reference energies and E(2) spin components of the calculations
+    of one base method, stacked as systems x SPIN_COMPONENTS"""
+
+    def __init__(self, systems, reference, components):
+        self.systems = list(systems)
+        self.reference = np.asarray(reference, dtype=np.float64)
+        self.components = np.asarray(components, dtype=np.float64).reshape(-1, 3)
+
+    @classmethod
+    def from_records(cls, records):
+        """From (system, reference energy, {kind: {'e2': value}})
+        records, as parsed by G09LogFile.mp2_spin_components"""
+        records = list(records)
+        return cls([r[0] for r in records], [r[1] for r in records],
+                   [[r[2][k]['e2'] for k in SPIN_COMPONENTS] for r in records])
+
+    def energies(self, variants):
+        """Energies of every system for each variant in
+        variants ({name: (a, b)}) as an EnergyMatrix
+        (systems x variants)"""
+        names = list(variants)
+        values = self.reference[:, np.newaxis] + \
+            self.components.dot(scaling_matrix(variants[n] for n in names))
+        return EnergyMatrix(self.systems, names, values)
+
+    def __len__(self):
+        return len(self.systems)
+
+    def __str__(self):
+        return "SpinComponents: {} systems".format(len(self.systems))
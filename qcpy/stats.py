@@ -0,0 +1,114 @@
+"""
+Error statistics of methods against reference values, vectorised
+over a methods x reactions matrix of errors (NaN where missing)
+"""
+import logging
+import warnings
+import numpy as np
+
+LOG = logging.getLogger(__name__)
+
+HARTREE = {
+    'hartree': 1.0,
+    'kcal/mol': 627.5094740631,
+    'kj/mol': 2625.4996394799,
+    'ev': 27.211386245988,
+}
+
+# mean absolute reference energy over all GMTKN55 subsets, kcal/mol
+WTMAD2_SCALE = 56.84
+
+STATISTICS = ('count', 'msd', 'mad', 'rmsd', 'max')
+
+
+def error_statistics(errors):
+    """Return a dict of arrays, one value per method (row) of errors:
+    count, mean signed (msd), mean absolute (mad), root mean square (rmsd)
+    and maximum absolute (max) error, ignoring missing (NaN) values
+
+    >>> s = error_statistics(np.array([[1.0, -3.0], [2.0, np.nan]]))
+    >>> s['mad'], s['max'], s['count']
+    (array([2., 2.]), array([3., 2.]), array([2, 1]))
+    """
+    errors = np.atleast_2d(errors)
+    present = ~np.isnan(errors)
+    count = present.sum(axis=1)
+    filled = np.where(present, errors, 0.0)
+    absolute = np.abs(filled)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = {
+            'count': count,
+            'msd': filled.sum(axis=1) / count,
+            'mad': absolute.sum(axis=1) / count,
+            'rmsd': np.sqrt((filled ** 2).sum(axis=1) / count),
+            'max': np.where(count > 0, absolute.max(axis=1, initial=0.0), np.nan),
+        }
+    return result
+
+
+def _resampled_statistic(errors, indices, statistic):
+    """statistic of errors (methods x n) for each row of indices
+    (samples x n), giving a methods x samples array"""
+    sample = errors[:, indices]
+    present = ~np.isnan(sample)
+    count = present.sum(axis=2)
+    filled = np.where(present, sample, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if statistic == 'mad':
+            return np.abs(filled).sum(axis=2) / count
+        if statistic == 'msd':
+            return filled.sum(axis=2) / count
+        if statistic == 'rmsd':
+            return np.sqrt((filled ** 2).sum(axis=2) / count)
+        if statistic == 'max':
+            return np.where(count > 0, np.abs(filled).max(axis=2), np.nan)
+    raise ValueError('Unknown statistic {}'.format(statistic))
+
+
+def bootstrap_confidence_interval(errors, *, statistic='mad', samples=1000,
+                                  confidence=0.95, seed=0, max_elements=2**24):
+    """Percentile bootstrap confidence interval of statistic for each method
+    (row) of errors, returning (lower, upper) arrays. Every method is
+    resampled with the same reaction indices, in batches of at most
+    max_elements resampled values to bound memory use."""
+    errors = np.atleast_2d(errors)
+    n_methods, n = errors.shape
+    if n == 0:
+        empty = np.full(n_methods, np.nan)
+        return empty, empty.copy()
+    rng = np.random.RandomState(seed)
+    batch = max(1, max_elements // max(1, n_methods * n))
+    values = []
+    for start in range(0, samples, batch):
+        indices = rng.randint(0, n, size=(min(batch, samples - start), n))
+        values.append(_resampled_statistic(errors, indices, statistic))
+    values = np.concatenate(values, axis=1)
+    tail = 50.0 * (1.0 - confidence)
+    with warnings.catch_warnings():
+        # methods without any values give NaN, which is fine
+        warnings.simplefilter('ignore', RuntimeWarning)
+        lower, upper = np.nanpercentile(values, [tail, 100.0 - tail], axis=1)
+    return lower, upper
+
+
+def weighted_mad(mads, counts, mean_absolute_references, scale=None, *,
+                 units='kcal/mol'):
+    """WTMAD-2 style weighted MAD over benchmarks, for each method.
+    mads and counts are benchmarks x methods arrays, and
+    mean_absolute_references the mean |reference| of each benchmark:
+    sum_i N_i (scale / |ref|_i) MAD_i / sum_i N_i, skipping benchmarks
+    where a method has no values. scale defaults to WTMAD2_SCALE
+    converted to units, the units of mads and the references
+
+    >>> weighted_mad(np.array([[1.0], [2.0]]), np.array([[10], [30]]), np.array([56.84, 2 * 56.84]))
+    array([1.])
+    """
+    if scale is None:
+        scale = WTMAD2_SCALE * HARTREE[units.lower()] / HARTREE['kcal/mol']
+    mads = np.atleast_2d(mads)
+    counts = np.atleast_2d(counts)
+    weights = counts * (scale / np.asarray(mean_absolute_references))[:, np.newaxis]
+    present = (counts > 0) & ~np.isnan(mads)
+    total = np.where(present, weights * np.where(present, mads, 0.0), 0.0).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return total / np.where(present, counts, 0).sum(axis=0)
@@ -1,14 +1,62 @@
-"""All templates"""
+"""All templates, compiled on first use. Jinja2 is only imported
+then, and compiled templates are kept in its bytecode cache so later
+processes load them instead of compiling them again."""
 import os
 import logging
-from jinja2 import Environment, FileSystemLoader, Template
 
 LOG = logging.getLogger(__name__)
-_ENV = Environment(loader=FileSystemLoader(os.path.dirname(os.path.abspath(__file__))))
+TEMPLATE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+_ENV = None
 
-GaussianSCF = _ENV.get_template('gaussian_scf.template')
-TontoSCF = _ENV.get_template('tonto_scf.template')
-EmptyTemplate = _ENV.get_template('empty.template')
+
+def _environment():
+    global _ENV
+    if _ENV is None:
+        from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+        _ENV = Environment(loader=FileSystemLoader(TEMPLATE_DIRECTORY),
+                           bytecode_cache=FileSystemBytecodeCache())
+    return _ENV
+
+
+class LazyTemplate:
+    """A template compiled when first rendered (or otherwise used)"""
+
+    def __init__(self, filename=None, environment=None, text=None):
+        self.filename = filename
+        self.environment = environment
+        self.text = text
+        self._template = None
+
+    @property
+    def template(self):
+        if self._template is None:
+            if self.text is not None:
+                from jinja2 import Template
+                self._template = Template(self.text)
+            else:
+                LOG.debug('Compiling template %s', self.filename)
+                env = self.environment() if self.environment else _environment()
+                self._template = env.get_template(self.filename)
+        return self._template
+
+    def render(self, *args, **kwargs):
+        return self.template.render(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # private and special names (e.g. looked up by copy and pickle
+        # before __init__ has run) are never the template's
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.template, name)
+
+    def __getstate__(self):
+        # the compiled template is rebuilt when needed
+        return dict(self.__dict__, _template=None)
+
+
+GaussianSCF = LazyTemplate('gaussian_scf.template')
+TontoSCF = LazyTemplate('tonto_scf.template')
+EmptyTemplate = LazyTemplate('empty.template')
 
 _ALL_TEMPLATES = {
         'gaussian_scf': GaussianSCF,
@@ -19,11 +67,14 @@ _ALL_TEMPLATES = {
 def add_template(text=None, filename=None, name='new_template'):
     if filename:
         path, filename = os.path.split(filename)
-        _ALL_TEMPLATES[name] = Environment(
-            loader=FileSystemLoader(path or './')
-            ).get_template(filename)
+
+        def environment():
+            from jinja2 import Environment, FileSystemLoader
+            return Environment(loader=FileSystemLoader(path or './'))
+
+        _ALL_TEMPLATES[name] = LazyTemplate(filename, environment)
     elif text:
-        _ALL_TEMPLATES[name] = Template(text)
+        _ALL_TEMPLATES[name] = LazyTemplate(text=text)
     return _ALL_TEMPLATES[name]
 
 
@@ -1,2 +1,23 @@
 import logging
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
 logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+
+class FileTestCase(TestCase):
+    """Runs each test with an empty temporary directory, self.directory"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, name, text):
+        """Write text to the file name in self.directory, returning its path"""
+        path = self.directory / name
+        path.write_text(text)
+        return path
@@ -0,0 +1,254 @@
+"""
+chembench command line tool tests
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from qcpy.cli import (
+    create_input_files, plan_calculations, InputManifest, MANIFEST_FILENAME,
+    OutputWatcher, OutputIndex, process_outputs
+)
+from qcpy.results import ResultsStore, REACTION_ENERGIES
+from qcpy.jobs.gaussian import UnknownmethodError
+from . import FileTestCase
+from .test_geometry import H2O
+
+
+class TestCreateInputFiles(FileTestCase):
+    """Test case for input generation"""
+
+    def setUp(self):
+        super().setUp()
+        self.root = str(self.directory)
+        self.systems = {'h2o': H2O}
+
+    def manifest(self, output_format='files'):
+        return InputManifest(Path(self.root, 'calcs', MANIFEST_FILENAME), output_format)
+
+    def test_rerun_writes_nothing(self):
+        """Unchanged inputs are not rewritten"""
+        create_input_files(self.root, self.systems, 'def2svp', progress=False)
+        filename = Path(self.root, 'calcs', 'b3lyp', 'h2o.gjf')
+        os.utime(str(filename), (0, 0))
+        manifest = self.manifest()
+        create_input_files(self.root, self.systems, 'def2svp',
+                           manifest=manifest, progress=False)
+        self.assertEqual(filename.stat().st_mtime, 0)
+        self.assertEqual(manifest.added + manifest.changed + manifest.removed, [])
+
+    def test_removed_inputs_deleted(self):
+        """Inputs no longer generated are removed"""
+        create_input_files(self.root, self.systems, 'def2svp', progress=False)
+        manifest = self.manifest()
+        create_input_files(self.root, self.systems, 'def2svp', link1=4,
+                           manifest=manifest, progress=False)
+        self.assertIn('blyp/h2o.gjf', manifest.removed)
+        self.assertIn('link1/h2o.0.gjf', manifest.added)
+        self.assertFalse(Path(self.root, 'calcs', 'blyp').exists())
+
+    def test_deleted_inputs_restored(self):
+        """Inputs deleted by hand are written again"""
+        create_input_files(self.root, self.systems, 'def2svp', progress=False)
+        filename = Path(self.root, 'calcs', 'b3lyp', 'h2o.gjf')
+        filename.unlink()
+        manifest = self.manifest()
+        create_input_files(self.root, self.systems, 'def2svp',
+                           manifest=manifest, progress=False)
+        self.assertTrue(filename.exists())
+        self.assertEqual(manifest.restored, ['b3lyp/h2o.gjf'])
+        self.assertEqual(manifest.added, [])
+
+    def test_deleted_bundle(self):
+        """A bundle deleted by hand is not removed again"""
+        create_input_files(self.root, self.systems, 'def2svp', bundle=True,
+                           progress=False)
+        Path(self.root, 'calcs', 'inputs.sqlite').unlink()
+        create_input_files(self.root, self.systems, 'def2svp', progress=False)
+        self.assertTrue(Path(self.root, 'calcs', 'b3lyp', 'h2o.gjf').exists())
+
+    def test_parallel_inputs(self):
+        """Inputs written in parallel match those written serially"""
+        def contents(root):
+            calcs = Path(root, 'calcs')
+            return {str(p.relative_to(calcs)): p.read_text()
+                    for p in calcs.glob('**/*.gjf')}
+
+        create_input_files(self.root, self.systems, 'def2svp', link1=4, progress=False)
+        with tempfile.TemporaryDirectory() as root:
+            create_input_files(root, self.systems, 'def2svp', link1=4, jobs=2,
+                               progress=False)
+            self.assertEqual(contents(root), contents(self.root))
+        self.assertTrue(contents(self.root))
+
+    def test_parallel_bundle(self):
+        """Bundled inputs match those written in parallel"""
+        create_input_files(self.root, self.systems, 'def2svp', jobs=2, progress=False)
+        files = self.manifest().previous
+        manifest = self.manifest('bundle')
+        create_input_files(self.root, self.systems, 'def2svp', bundle=True,
+                           manifest=manifest, progress=False)
+        self.assertEqual(manifest.current, files)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.root, 'calcs'))),
+                         ['inputs.sqlite', 'manifest.json'])
+
+
+class TestImports(TestCase):
+    """Test case for the cost of starting the command line tools"""
+
+    def test_lazy_imports(self):
+        """Importing the command line tools leaves heavy dependencies unimported"""
+        code = ('import sys, qcpy.cli; '
+                'print(sorted(m for m in ("numpy", "jinja2", "tqdm") if m in sys.modules))')
+        output = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(output.decode().strip(), '[]')
+
+    def test_lazy_attributes(self):
+        """Lazily built attributes are real module attributes, so
+        importing them does not rely on a module __getattr__"""
+        from qcpy.jobs import gaussian
+        self.assertIn('available_methods', vars(gaussian))
+        self.assertNotIn('__getattr__', vars(gaussian))
+        self.assertIn('b3lyp', gaussian.available_methods)
+        code = 'import qcpy; print(qcpy.Geometry.__name__, qcpy.XYZFile.__name__)'
+        output = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(output.decode().strip(), 'Geometry XYZFile')
+
+
+class TestPlanCalculations(TestCase):
+    """Test case for planning the calculations needed"""
+
+    def test_derived_methods(self):
+        """Derived methods resolve to the calculations they need"""
+        plan = plan_calculations(['pbe1pbe + d3(bj)', 's2-mp', 'scsn-mp2', 'LDA'])
+        self.assertEqual(plan['calculations'], ['mp2', 'pbe1pbe', 'svwn5'])
+        self.assertEqual(plan['requested'],
+                         ['pbe1pbe + d3(bj)', 's2-mp', 'scsn-mp2', 'svwn5'])
+
+    def test_invalid_dispersion_correction(self):
+        """Dispersion corrections of dispersion corrected methods are refused"""
+        with self.assertRaises(UnknownmethodError):
+            plan_calculations(['b97d + d3(bj)'])
+
+    def test_planned_inputs_only(self):
+        """Only planned calculations get input files"""
+        with tempfile.TemporaryDirectory() as root:
+            plan = plan_calculations(['b3lyp + d3(bj)', 'scs-mp2'])
+            create_input_files(root, {'h2o': H2O}, 'def2svp',
+                               methods=plan['calculations'], progress=False)
+            self.assertEqual(sorted(os.listdir(os.path.join(root, 'calcs'))),
+                             ['b3lyp', 'manifest.json', 'mp2'])
+
+
+INFO = {
+    'benchmark': 'TEST',
+    'reactions': {'r1': {'reactants': [[2], ['h.xyz']], 'products': [[1], ['h2.xyz']]}},
+}
+XYZ = {
+    'h': '1\nh\nH 0.0 0.0 0.0\n',
+    'h2': '2\nh2\nH 0.0 0.0 0.0\nH 0.0 0.0 0.74\n',
+}
+LOG_LINES = [
+    ' SCF Done:  E(RHF) =  {0}     A.U. after   10 cycles\n',
+    ' 1\\1\\GINC\\SP\\RHF\\H2\\\\#p\\\\title\\\\HF={0}\\RMSD=1e-9\\@\n',
+    ' Normal termination of Gaussian 09 at Thu Jan  1 00:00:00 1970.\n',
+]
+
+
+class BenchmarkTestCase(FileTestCase):
+    """Creates a benchmark directory with hf logs to process"""
+
+    def setUp(self):
+        super().setUp()
+        self.root = self.directory
+        with open(str(self.root / 'info.json'), 'w') as f:
+            json.dump(INFO, f)
+        (self.root / 'xyz').mkdir()
+        for name, contents in XYZ.items():
+            (self.root / 'xyz' / (name + '.xyz')).write_text(contents)
+        (self.root / 'calcs' / 'hf').mkdir(parents=True)
+
+    def write_log(self, name, energy, lines=3):
+        path = self.root / 'calcs' / 'hf' / (name + '.log')
+        with path.open('a') as f:
+            f.writelines(line.format(energy) for line in LOG_LINES[:lines])
+
+
+class TestProcessOutputs(BenchmarkTestCase):
+    """Test case for processing finished calculations"""
+
+    def test_streaming(self):
+        """Streaming gives the same stored results, without JSON files"""
+        self.write_log('h', -0.5)
+        self.write_log('h2', -1.1)
+        process_outputs(str(self.root), None)
+        with ResultsStore(self.root / 'results.sqlite') as store:
+            expected = store.query(), store.query(REACTION_ENERGIES)
+        (self.root / 'energies.json').unlink()
+        (self.root / 'reaction_energies.json').unlink()
+        process_outputs(str(self.root), None, overwrite=True, streaming=True)
+        self.assertFalse((self.root / 'energies.json').exists())
+        with ResultsStore(self.root / 'results.sqlite') as store:
+            self.assertEqual((store.query(), store.query(REACTION_ENERGIES)), expected)
+            self.assertEqual(store.systems('TEST'), ['h', 'h2'])
+
+
+class TestBasisSetLadders(BenchmarkTestCase):
+    """Test case for processing guess=read basis set ladder logs"""
+
+    def test_truncated_ladder_ignored(self):
+        """A log cut off after the guess basis step gives no energy"""
+        with open(str(self.root / 'info.json'), 'w') as f:
+            json.dump(dict(INFO, **{'guess basis set': 'sto-3g'}), f)
+        self.write_log('h', -0.4)
+        self.write_log('h2', -1.0)
+        self.write_log('h2', -1.1)
+        process_outputs(str(self.root), None)
+        with open(str(self.root / 'energies.json')) as f:
+            self.assertEqual(json.load(f)['hf'], {'h2': -1.1})
+
+
+class TestOutputIndex(BenchmarkTestCase):
+    """Test case for the index of calculation outputs"""
+
+    def test_unchanged_directories_reused(self):
+        """Saved directories are only listed again once changed"""
+        self.write_log('h', -0.5)
+        path = self.root / 'calcs' / 'outputs.json'
+        index = OutputIndex(self.root, path=path).scan()
+        self.assertEqual(list(index.logs('hf')), ['h.log'])
+        index.write()
+        index = OutputIndex(self.root, path=path).scan()
+        self.assertEqual(index.listed, 0)
+        self.assertEqual(index.size, (self.root / 'calcs' / 'hf' / 'h.log').stat().st_size)
+        self.write_log('h2', -1.1)
+        os.utime(str(self.root / 'calcs' / 'hf'), ns=(0, 0))
+        index = OutputIndex(self.root, path=path).scan()
+        self.assertEqual(index.listed, 1)
+        self.assertEqual(sorted(index.logs('hf')), ['h.log', 'h2.log'])
+
+
+class TestOutputWatcher(BenchmarkTestCase):
+    """Test case for watch mode processing"""
+
+    def reaction_energies(self):
+        with open(str(self.root / 'reaction_energies.json')) as f:
+            return json.load(f)
+
+    def test_finished_logs_published(self):
+        """Only finished logs are read, and a restarted watcher resumes"""
+        self.write_log('h', -0.5)
+        self.write_log('h2', -1.1, lines=2)
+        watcher = OutputWatcher(self.root)
+        self.assertEqual(watcher.poll(), 1)
+        self.assertEqual(self.reaction_energies(), {})
+        self.assertEqual(watcher.poll(), 0)
+
+        with (self.root / 'calcs' / 'hf' / 'h2.log').open('a') as f:
+            f.write(LOG_LINES[2])
+        watcher = OutputWatcher(self.root)
+        self.assertEqual(watcher.poll(), 1)
+        self.assertAlmostEqual(self.reaction_energies()['r1']['hf'], -0.1)
@@ -0,0 +1,70 @@
+"""
+D3(BJ) dispersion tests
+"""
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+from pathlib import Path
+import numpy as np
+from qcpy.utils import d3bj_dispersion, d3bj_parameters, d3_correction, D3Cache
+
+NUMBERS = np.array([8, 1, 1])
+# bohr
+POSITIONS = np.array([
+    [0.0, 0.0, -0.7357858],
+    [1.4418315, 0.0, 0.3678929],
+    [-1.4418315, 0.0, 0.3678929]])
+# two body energies from s-dftd3 1.x for the same geometry
+REFERENCE = {'b3lyp': -5.738366752447e-04, 'pbe0': -2.768566260598e-04}
+
+
+class TestDispersion(TestCase):
+    """Test case for the D3(BJ) dispersion correction"""
+
+    def test_matches_reference(self):
+        """Energies agree with the reference implementation"""
+        for functional, expected in REFERENCE.items():
+            self.assertAlmostEqual(d3_correction(NUMBERS, POSITIONS, functional=functional),
+                                   expected, places=12)
+
+    def test_gaussian_names(self):
+        """Gaussian keywords map to the right parameters"""
+        self.assertEqual(d3bj_parameters('PBE1PBE'), d3bj_parameters('pbe0'))
+        self.assertEqual(d3bj_parameters('cam-b3lyp'), d3bj_parameters('camb3lyp'))
+        with self.assertRaises(KeyError):
+            d3bj_parameters('m062x')
+
+    def test_batched_and_chunked(self):
+        """All functionals at once in small chunks match one at a time"""
+        rng = np.random.RandomState(0)
+        numbers = rng.choice([1, 6, 7, 8, 26], size=40)
+        positions = rng.uniform(-8, 8, size=(40, 3))
+        functionals = ['b3lyp', 'pbe0', 'blyp', 'tpssh']
+        batched = d3bj_dispersion(numbers, positions,
+                                  [d3bj_parameters(f) for f in functionals],
+                                  max_elements=500)
+        single = [d3_correction(numbers, positions, functional=f) for f in functionals]
+        np.testing.assert_allclose(batched, single, rtol=1e-12)
+
+
+class TestDispersionCache(TestCase):
+    """Test case for the persistent dispersion cache"""
+
+    def test_computed_once(self):
+        """Each geometry and parameter set is only evaluated once"""
+        parameters = {f: d3bj_parameters(f) for f in REFERENCE}
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir, 'd3_cache.json')
+            cache = D3Cache(path)
+            corrections = cache.corrections(NUMBERS, POSITIONS, parameters)
+            for functional, expected in REFERENCE.items():
+                self.assertAlmostEqual(corrections[functional], expected, places=12)
+            # same parameters under another name
+            cache.corrections(NUMBERS, POSITIONS, {'pbe1pbe': d3bj_parameters('pbe1pbe')})
+            self.assertEqual(cache.computed, 2)
+            cache.write()
+
+            cache = D3Cache(path)
+            self.assertEqual(cache.corrections(NUMBERS, POSITIONS, parameters), corrections)
+            self.assertEqual(cache.computed, 0)
+            cache.corrections(NUMBERS, POSITIONS + 1.0, parameters)
+            self.assertEqual(cache.computed, 2)
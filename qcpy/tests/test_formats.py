@@ -0,0 +1,254 @@
+"""
+File format tests
+"""
+import os
+import tempfile
+import warnings
+from unittest import TestCase
+from qcpy.formats.gaussian import G09LogFile
+from qcpy.formats.tonto_output import TontoOutputFile
+from qcpy.formats.fchk import FchkFile
+from qcpy.formats.cube import CubeFile, write_cube, format_reals
+from qcpy.formats import FileFormatError
+from . import FileTestCase
+import numpy as np
+
+LINK1_LOG = [
+    " Entering Link 1 = /g09/l1.exe PID=       1.\n",
+    " 1\\1\\GINC\\SP\\RB3LYP\\Def2SVP\\H2O1\\\\#p b3lyp/def2svp\\\\HF=-76.1\\@\n",
+    " Normal termination of Gaussian 09 at Thu Jan  1 00:00:00 1970.\n",
+    " Entering Link 1 = /g09/l1.exe PID=       2.\n",
+    " 1\\1\\GINC\\SP\\RB3LYP\\Def2QZVPP\\H2O1\\\\#p b3lyp/def2qzvpp\\\\HF=-76.4\\@\n",
+    " Normal termination of Gaussian 09 at Thu Jan  1 00:00:01 1970.\n",
+]
+
+MP2_LOG = [
+    " Entering Link 1 = /g09/l1.exe PID=       1.\n",
+    " Cycle   1  Pass 1  IDiag  1:\n",
+    " E= -75.8000000000000    \n",
+    " SCF Done:  E(RHF) =  -75.9000000000     A.U. after    9 cycles\n",
+    " Spin components of T(2) and E(2):\n",
+    "     alpha-alpha  T2 =       0.1000000D-01 E2=    -0.2000000D-01\n",
+    "     alpha-beta   T2 =       0.5000000D-01 E2=    -0.1500000D+00\n",
+    "     beta-beta    T2 =       0.1000000D-01 E2=    -0.2000000D-01\n",
+    " E2 =    -0.1900000000D+00 EUMP2 =    -0.76090000000000D+02\n",
+    " 1\\1\\GINC-NODE\\SP\\RMP2-FC\\def2SVP\\H2O1\\USER\\01-Jan-2020\\0\\\\#p mp2/def\n",
+    " 2svp\\\\title\\\\0,1\\O,0.,0.,0.1\\H,0.,0.75,-0.47\\H,0.,-0.75,-0.47\\\\Version=E\n",
+    " S64L-G09RevD.01\\State=1-A1\\HF=-75.9\\MP2=-76.0\n",
+    " 9\\RMSD=1.2e-09\\PG=C02V [C2(O1),SG(H2)]\\\\@\n",
+    "\n",
+    " The archive entry ends at the blank line above.\n",
+    " Normal termination of Gaussian 09 at Thu Jan  1 00:00:00 1970.\n",
+]
+
+TONTO_OUTPUT = [
+    "Tonto\n",
+    "===========\n",
+    "SCF results\n",
+    "===========\n",
+    "\n",
+    "Kind of SCF calculation ......... rhf\n",
+    "SCF energy ..................... -0.7598503D+02\n",
+    "No. of iterations ................ 9\n",
+    "\n",
+    "====================\n",
+    "Molecular properties\n",
+    "====================\n",
+    "Dipole ........... 0.61\n",
+    "output= done\n",
+]
+
+FCHK = """\
+h2 energy
+SP        RHF                                                         STO-3G
+Number of atoms                            I                2
+Charge                                     I                0
+Multiplicity                               I                1
+Number of basis functions                  I                2
+Atomic numbers                             I   N=           2
+           1           1
+Current cartesian coordinates              R   N=           6
+  0.00000000E+00  0.00000000E+00  0.00000000E+00  0.00000000E+00  0.00000000E+00
+  1.40000000E+00
+SCF Energy                                 R     -1.116759307396700E+00
+Alpha MO coefficients                      R   N=           4
+  5.48993297E-01  5.48993297E-01  1.21146340E+00 -1.21146340E+00
+Total SCF Density                          R   N=           3
+  6.02777602E-01  6.02777602E-01  6.02777602E-01
+Shell types                                I   N=           2
+           0           0
+"""
+
+
+class TestG09LogFile(TestCase):
+    """Test case for g09 log files"""
+
+    def test_link1_steps(self):
+        """Multi-step logs split on termination lines"""
+        log = G09LogFile.from_lines(LINK1_LOG)
+        self.assertEqual([s.scf_energy for s in log.steps], [-76.1, -76.4])
+        self.assertEqual(log.final_step.scf_energy, -76.4)
+
+    def test_single_step(self):
+        """Single step logs are their own final step"""
+        log = G09LogFile.from_lines(LINK1_LOG[:3])
+        self.assertIs(log.final_step, log)
+
+    def test_summary(self):
+        """Summaries keep only the lines needed, with the same results"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'h2o.log')
+            with open(filename, 'w') as f:
+                f.writelines(MP2_LOG)
+            full = G09LogFile(filename)
+            summary = G09LogFile.summary(filename)
+        self.assertEqual(len(summary.contents), 10)
+        for attribute in ('scf_energy', 'hf_energy', 'converged', 'mp2_spin_components'):
+            self.assertEqual(getattr(summary, attribute), getattr(full, attribute))
+        self.assertEqual(summary.scf_energy, -76.09)
+
+
+class TestTontoOutputFile(FileTestCase):
+    """Test case for tonto output files"""
+
+    def setUp(self):
+        super().setUp()
+        self.filename = self.write('stdout', ''.join(TONTO_OUTPUT))
+
+    def test_structured_contents(self):
+        """Sections are read as strings between banners"""
+        contents = TontoOutputFile(self.filename).structured_contents
+        self.assertEqual(list(contents), ['SCF results', 'Molecular properties'])
+        self.assertEqual(contents['SCF results']['Kind of SCF calculation'], 'rhf')
+        self.assertEqual(contents['Molecular properties'], {'Dipole': '0.61'})
+
+    def test_typed_sections(self):
+        """Only the sections asked for are parsed, with numeric values"""
+        output = TontoOutputFile(self.filename)
+        sections = list(output.sections(['Molecular properties'], typed=True))
+        self.assertEqual(sections, [('Molecular properties', {'Dipole': 0.61})])
+        self.assertEqual(output.section('SCF results')['No. of iterations'], 9)
+        self.assertEqual(output.scf_energy, -75.98503)
+
+    def test_no_scf_energy(self):
+        """An output without an energy is only read once for it"""
+        output = TontoOutputFile(self.write('empty', ''))
+        self.assertIsNone(output.scf_energy)
+        self.directory.joinpath('empty').unlink()
+        self.assertIsNone(output.scf_energy)
+
+    def test_missing_file(self):
+        """Missing outputs raise when the output file is constructed"""
+        with self.assertRaises(FileNotFoundError):
+            TontoOutputFile(self.directory / 'missing')
+
+
+class TestFchkFile(FileTestCase):
+    """Test case for formatted checkpoint files"""
+
+    def setUp(self):
+        super().setUp()
+        self.filename = self.write('h2.fchk', FCHK)
+
+    def test_index(self):
+        """Scalars are read when indexing, arrays only when accessed"""
+        with FchkFile(self.filename) as fchk:
+            self.assertEqual(len(fchk), 10)
+            self.assertEqual((fchk.job_type, fchk.method, fchk.basis_set),
+                             ('SP', 'RHF', 'STO-3G'))
+            self.assertEqual(fchk.scf_energy, -1.1167593073967)
+            self.assertNotIn('Alpha MO coefficients', fchk._values)
+            self.assertEqual(list(fchk['Shell types']), [0, 0])
+            self.assertNotIn('Total SCF Density', fchk._values)
+
+    def test_truncated_arrays(self):
+        """Arrays with fewer values than their count are format errors"""
+        self.write('h2.fchk', FCHK.replace('R   N=           4', 'R   N=          13')
+                                  .replace('I   N=           2\n           0', 'I   N=          13\n           0'))
+        with FchkFile(self.filename) as fchk:
+            for name in ('Alpha MO coefficients', 'Shell types'):
+                with self.assertRaises(FileFormatError):
+                    fchk[name]
+
+    def test_header_line_number(self):
+        """Errors in headers report their line"""
+        self.write('h2.fchk', FCHK.replace('SCF Energy', 'not a header\nSCF Energy'))
+        with self.assertRaises(FileFormatError) as context:
+            FchkFile(self.filename)
+        self.assertEqual(context.exception.line, 12)
+
+    def test_arrays(self):
+        """Arrays are reshaped into matrices and geometries"""
+        with FchkFile(self.filename) as fchk:
+            self.assertEqual(len(fchk.geometry.atoms), 2)
+            self.assertEqual(fchk['Current cartesian coordinates'][-1], 1.4)
+            coefficients = fchk.mo_coefficients()
+            self.assertEqual(coefficients.shape, (2, 2))
+            self.assertEqual(coefficients[1, 1], -1.2114634)
+            self.assertIsNone(fchk.mo_coefficients('beta'))
+            density = fchk.density_matrix()
+            self.assertTrue(np.allclose(density, 0.602777602))
+
+
+class TestCubeFile(FileTestCase):
+    """Test case for cube files"""
+
+    def setUp(self):
+        super().setUp()
+        self.filename = str(self.directory / 'density.cube')
+        self.data = np.arange(2 * 3 * 7, dtype=np.float64).reshape(2, 3, 7) * -0.125
+        self.data[0, 0, 0] = 1.234567e-10
+        write_cube(self.filename, self.data, [1, 1], [[0, 0, 0], [0, 0, 1.4]],
+                   origin=(-1.0, -1.0, -1.0), axes=np.eye(3) * 0.5,
+                   comments=('h2', 'density'))
+
+    def test_header(self):
+        """The header is read without the data"""
+        cube = CubeFile(self.filename)
+        self.assertIsNone(cube._data)
+        self.assertEqual(cube.comments, ('h2', 'density'))
+        self.assertEqual(cube.shape, (2, 3, 7))
+        self.assertEqual(list(cube.origin), [-1.0, -1.0, -1.0])
+        self.assertEqual(cube.axes[2, 2], 0.5)
+        self.assertEqual(cube.units, 'bohr')
+        self.assertEqual(cube.geometry.molecular_formula, 'H2')
+
+    def test_data(self):
+        """Data round trips through the text and the .npy cache"""
+        cube = CubeFile(self.filename, cache=True)
+        self.assertEqual(cube.data[0, 0, 0], 1.23457e-10)
+        self.assertTrue(np.array_equal(cube.data[1:], self.data[1:]))
+        self.assertTrue(os.path.exists(self.filename + '.npy'))
+        cached = CubeFile(self.filename, cache=True).data
+        self.assertIsInstance(cached, np.memmap)
+        self.assertTrue(np.array_equal(cached, cube.data))
+
+    def test_write(self):
+        """Derived grids are written with the same header"""
+        cube = CubeFile(self.filename)
+        difference = str(self.directory / 'difference.cube')
+        cube.write(difference, cube.data - 1.0)
+        with open(self.filename) as f:
+            header = f.readlines()[:8]
+        with open(difference) as f:
+            lines = f.readlines()
+        self.assertEqual(lines[:8], header)
+        self.assertEqual(lines[8], ' -1.00000E+00 -1.12500E+00 -1.25000E+00'
+                                   ' -1.37500E+00 -1.50000E+00 -1.62500E+00\n')
+        self.assertEqual(lines[9], ' -1.75000E+00\n')
+        self.assertTrue(np.allclose(CubeFile(difference).data, self.data - 1.0))
+
+    def test_format_near_halfway(self):
+        """Values near halfway between two mantissas round as printf does"""
+        values = [6.548335, -1.234565e-3, 2.000005e12, 9.999995, 1.0000005e-8,
+                  99999.95, 99.99995, 9.999995e-08, 9.999995e20, 9.999995e-20]
+        expected = ''.join('{:13.5E}'.format(v) for v in values)
+        self.assertEqual(format_reals(values).tobytes().decode(), expected)
+
+    def test_format_non_finite(self):
+        """Non-finite values are formatted without warnings"""
+        values = [np.inf, -np.inf, np.nan, 1.0]
+        expected = ''.join('{:13.5E}'.format(v) for v in values)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            self.assertEqual(format_reals(values).tobytes().decode(), expected)
@@ -1,6 +1,9 @@
 from unittest import TestCase
 from qcpy.jobs.job import *
 from qcpy.jobs import GaussianJob, TontoJob
+from qcpy.jobs.gaussian import link1_input, geometry_block, SCF
+from qcpy.jobs.tonto import TontoKeywords
+from qcpy.templates import EmptyTemplate
 from .test_geometry import H2O
 
 
@@ -46,6 +49,25 @@ class TestTontoJob(JobCommon, TestCase):
             self.job.set_basis_set(invalid_basis)
 
 
+    def test_parameter_attributes(self):
+        """tonto job parameters are attributes, overriding the defaults"""
+        job = TontoJob(geometry=H2O, template=EmptyTemplate)
+        self.assertIs(job.template, EmptyTemplate)
+        self.assertEqual(job.method, 'hf')
+        self.assertIsNone(job.output_precision)
+        with self.assertRaises(AttributeError):
+            job._output_precision
+
+    def test_keywords_modified(self):
+        """tonto keyword input lines follow changes to nested blocks"""
+        keywords = TontoKeywords({'scfdata': {'diis': {'convergence_tolerance': 1e-5}},
+                                  'scf': None})
+        self.assertEqual(keywords.as_input_lines(), 'scfdata= {\n  diis= {\n'
+                         '    convergence_tolerance= 1e-05\n  }\n}\nscf')
+        keywords['scfdata']['diis']['convergence_tolerance'] = 1e-6
+        self.assertIn('convergence_tolerance= 1e-06', keywords.as_input_lines())
+
+
 class TestGaussianJob(JobCommon, TestCase):
     _name = "gaussian_energy_job"
     _geometry = H2O
@@ -54,3 +76,47 @@ class TestGaussianJob(JobCommon, TestCase):
     def test_dependencies_exist(self):
         """g09 jobs depend on input file"""
         self.assertTrue(self.job.has_dependencies)
+
+    def test_basis_set_ladder(self):
+        """g09 basis set ladder reads the guess from the checkpoint"""
+        job = GaussianJob(geometry=H2O, method='b3lyp', basis_set='def2qzvpp',
+                          guess_basis_set='def2svp', chkfile='h2o.chk')
+        first, second = job.render().split('--Link1--\n')
+        self.assertIn('%chk=h2o.chk\n#p b3lyp/def2svp ', first)
+        self.assertIn('%chk=h2o.chk\n#p b3lyp/def2qzvpp  guess=read ', second)
+
+    def test_link1_input(self):
+        """g09 jobs pack into one multi-step input"""
+        text = link1_input(GaussianJob(geometry=H2O, method=m, basis_set='sto-3g')
+                           for m in ('blyp', 'pbepbe'))
+        steps = text.split('--Link1--\n')
+        self.assertEqual(len(steps), 2)
+        self.assertIn('#p pbepbe/sto-3g', steps[1])
+
+    def test_params_not_shared(self):
+        """g09 job parameters do not leak between jobs"""
+        GaussianJob(geometry=H2O, method='blyp', chkfile='blyp.chk')
+        job = GaussianJob(geometry=H2O)
+        self.assertIsNone(job.chkfile)
+        self.assertEqual(job.method.method, 'hf')
+
+    def test_fast_render_matches_template(self):
+        """g09 inputs render identically without jinja"""
+        for options in ({}, {'mem': '2GB', 'nprocs': 4, 'chkfile': 'h2o.chk'},
+                        {'guess_basis_set': 'def2svp', 'chkfile': 'h2o.chk'}):
+            job = GaussianJob(geometry=H2O, method='b2gpplyp', **options)
+            cached = GaussianJob(geometry=H2O, method='b2gpplyp',
+                                 geometry_block=geometry_block(H2O), **options)
+            self.assertEqual(job.render(), SCF.render(**job.params))
+            self.assertEqual(cached.render(), job.render())
+
+    def test_copy_and_pickle(self):
+        """g09 jobs and their templates can be copied and pickled"""
+        import copy
+        import pickle
+        SCF.render(**self.job.params)
+        self.assertEqual(copy.copy(SCF).filename, SCF.filename)
+        template = pickle.loads(pickle.dumps(SCF))
+        self.assertEqual(template.render(**self.job.params), SCF.render(**self.job.params))
+        job = copy.deepcopy(GaussianJob(geometry=H2O, method='b3lyp'))
+        self.assertEqual(job.render(), GaussianJob(geometry=H2O, method='b3lyp').render())
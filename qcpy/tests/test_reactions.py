@@ -0,0 +1,40 @@
+"""
+Reaction energy tests
+"""
+from unittest import TestCase
+import numpy as np
+from qcpy.reactions import EnergyMatrix, StoichiometryMatrix
+
+ENERGIES = {
+    'hf': {'h2': -1.13, 'o2': -149.6, 'h2o': -76.0},
+    'mp2': {'h2': -1.16, 'h2o': -76.3},
+}
+REACTIONS = {
+    'water': [('h2', -2), ('o2', -1), ('h2o', 2)],
+    'nothing': [('h2', -1), ('h2', 1)],
+}
+
+
+class TestReactionEnergies(TestCase):
+    """Test case for reaction energies from a stoichiometry matrix"""
+    stoichiometry = StoichiometryMatrix.from_reactions(REACTIONS)
+    energies = EnergyMatrix.from_dict(ENERGIES)
+
+    def test_matches_direct_sum(self):
+        """Reaction energies match summing over the stoichiometry"""
+        result = self.stoichiometry.dot(self.energies).as_dict()
+        expected = sum(ENERGIES['hf'][s] * n for s, n in REACTIONS['water'])
+        self.assertEqual(result['water']['hf'], expected)
+        self.assertEqual(result['nothing'], {'hf': 0.0, 'mp2': 0.0})
+
+    def test_missing_energies_propagate(self):
+        """Missing system energies give missing reaction energies"""
+        result = self.stoichiometry.dot(self.energies)
+        self.assertTrue(np.isnan(result.values[result.rows.index('water'),
+                                               result.columns.index('mp2')]))
+        self.assertNotIn('mp2', result.as_dict()['water'])
+
+    def test_unknown_system(self):
+        """Systems without any energies give missing reaction energies"""
+        stoichiometry = StoichiometryMatrix.from_reactions({'r': [('he', 1)]})
+        self.assertEqual(stoichiometry.dot(self.energies).as_dict(), {})
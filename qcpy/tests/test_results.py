@@ -0,0 +1,47 @@
+"""
+Results store tests
+"""
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+from pathlib import Path
+from qcpy.results import ResultsStore, REACTION_ENERGIES
+
+ENERGIES = [('h2', 'hf', -1.13), ('h2o', 'hf', -76.0), ('h2', 'mp2', -1.16)]
+
+
+class TestResultsStore(TestCase):
+    """Test case for the SQLite results store"""
+
+    def test_query_subsets(self):
+        """Queries only return the rows asked for"""
+        with ResultsStore(':memory:') as store:
+            store.add_energies('W4', 'def2svp', ENERGIES)
+            store.add_energies('S22', 'def2svp', [('dimer', 'hf', -2.0)])
+            self.assertEqual(store.benchmarks(), ['S22', 'W4'])
+            self.assertEqual(store.methods('W4'), ['hf', 'mp2'])
+            rows = store.query(benchmark='W4', method=['mp2'])
+            self.assertEqual(rows, [('W4', 'def2svp', 'mp2', 'h2', -1.16)])
+            matrix = store.matrix('W4')
+            self.assertEqual(matrix.as_dict(transpose=True),
+                             {'hf': {'h2': -1.13, 'h2o': -76.0}, 'mp2': {'h2': -1.16}})
+
+    def test_clear_and_reopen(self):
+        """Results persist on disk, and clearing a benchmark replaces them"""
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir, 'results.sqlite')
+            with ResultsStore(path) as store:
+                store.add_reaction_energies('W4', 'def2svp', [('r1', 'hf', 0.1)])
+            with ResultsStore(path) as store:
+                self.assertEqual(len(store.query(REACTION_ENERGIES)), 1)
+                store.clear('W4')
+                self.assertEqual(store.query(REACTION_ENERGIES), [])
+
+    def test_remove_methods(self):
+        """Removing methods keeps the other results"""
+        with ResultsStore(':memory:') as store:
+            store.add_energies('W4', 'def2svp', ENERGIES)
+            store.add_reaction_energies('W4', 'def2svp', [('r1', 'mp2', 0.1)])
+            store.remove_methods('W4', {'mp2'})
+            self.assertEqual(store.methods('W4'), ['hf'])
+            self.assertEqual(store.systems('W4'), ['h2', 'h2o'])
+            self.assertEqual(store.query(REACTION_ENERGIES), [])
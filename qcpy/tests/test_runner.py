@@ -1,5 +1,11 @@
-from qcpy.jobs.runners import LocalRunner
-from qcpy.jobs.job import Job
+import json
+import os
+import subprocess
+import tempfile
+from qcpy.jobs.runners import LocalRunner, NullRunner, ChromeTraceExporter
+from qcpy.jobs.job import Job, BundledInputJob
+from qcpy.formats.bundle import InputBundle
+from qcpy.utils import working_directory
 from unittest import TestCase
 
 
@@ -22,7 +28,172 @@ class TestEchoJob(TestCase):
 
     def test_jobs_run(self):
         """LocalRunner works for echo jobs"""
-        self.runner.add_jobs(self.jobs)
-        for job, status in self.runner.run():
-            assert status == True
-            assert job.stdout.strip() == job.name
+        with tempfile.TemporaryDirectory() as tmp:
+            for job in self.jobs:
+                job.set_working_directory(tmp)
+            self.runner.add_jobs(self.jobs)
+            for job, status in self.runner.run():
+                assert status == True
+                assert job.stdout.strip() == job.name
+                assert job.stdout_path == os.path.join(tmp, job.name + '.stdout')
+
+    def test_stdout_parsed_as_captured(self):
+        """Captured stdout is fed line by line to the job's parser"""
+        lines = []
+        job = EchoJob("parsed_job")
+        job.stdout_parser = lambda: lines.append
+        with tempfile.TemporaryDirectory() as tmp:
+            job.set_working_directory(tmp)
+            self.assertTrue(LocalRunner().run_job(job))
+            self.assertEqual(job.stdout, "parsed_job\n")
+        self.assertEqual(lines, ["parsed_job\n"])
+
+
+class TestTracing(TestCase):
+    """Runner lifecycle hooks and trace export"""
+
+    def test_hooks_called_in_order(self):
+        """LocalRunner emits lifecycle events to hooks"""
+        events = []
+        runner = LocalRunner(hooks=[lambda e: events.append(e.kind)])
+        job = EchoJob("traced_job")
+        with tempfile.TemporaryDirectory() as tmp:
+            job.set_working_directory(tmp)
+            runner.add_job(job)
+            for job, status in runner.run():
+                assert status
+        self.assertEqual(events, ['queued', 'subprocess_start',
+                                  'subprocess_end', 'complete'])
+
+    def test_post_process_end_on_failure(self):
+        """Post-processing end events are emitted when it fails"""
+        events = []
+        job = EchoJob("failed_job")
+        job._requires_postprocessing = True
+        job.post_process = lambda: 1 / 0
+        with tempfile.TemporaryDirectory() as tmp:
+            job.set_working_directory(tmp)
+            with self.assertRaises(ZeroDivisionError):
+                LocalRunner(hooks=[lambda e: events.append(e.kind)]).run_job(job)
+        self.assertEqual(events[-2:], ['post_process_start', 'post_process_end'])
+
+    def test_chrome_trace_export(self):
+        """Chrome trace exporter writes balanced begin/end events"""
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'trace.json')
+            exporter = ChromeTraceExporter(filename)
+            runner = LocalRunner(hooks=[exporter])
+            job = EchoJob("exported_job")
+            job.set_working_directory(tmp)
+            runner.add_job(job)
+            list(runner.run())
+            exporter.write()
+            with open(filename) as f:
+                trace = json.load(f)
+        phases = [e['ph'] for e in trace['traceEvents']]
+        self.assertEqual(phases.count('B'), phases.count('E'))
+        self.assertEqual(trace['traceEvents'][-1]['args']['success'], True)
+
+
+class ScratchJob(EchoJob):
+    _command = "echo $GAUSS_SCRDIR > {job.name}.log; touch {job.name}.rwf; {job.status}"
+    status = "true"
+
+
+class TestScratch(TestCase):
+    """Jobs run in runner managed scratch directories"""
+
+    def test_outputs_staged_back(self):
+        """Only matching outputs are staged back, scratch is removed"""
+        with tempfile.TemporaryDirectory() as tmp:
+            scratch_root = os.path.join(tmp, 'scratch')
+            os.mkdir(scratch_root)
+            job = ScratchJob("scratch_job")
+            job.set_working_directory(os.path.join(tmp, 'work'))
+            runner = LocalRunner(scratch_directory=scratch_root)
+            self.assertTrue(runner.run_job(job))
+            self.assertEqual(sorted(os.listdir(job.working_directory)),
+                             ['scratch_job.log', 'scratch_job.stdout'])
+            with open(os.path.join(job.working_directory, 'scratch_job.log')) as f:
+                self.assertTrue(f.read().startswith(scratch_root))
+            self.assertEqual(os.listdir(scratch_root), [])
+
+    def test_scratch_removed_on_failure(self):
+        """Scratch is removed when the job fails"""
+        with tempfile.TemporaryDirectory() as tmp:
+            job = ScratchJob("failing_job")
+            job.status = "false"
+            job.set_working_directory(os.path.join(tmp, 'work'))
+            runner = LocalRunner(scratch_directory=tmp)
+            with self.assertRaises(subprocess.CalledProcessError):
+                runner.run_job(job)
+            self.assertEqual(sorted(os.listdir(tmp)), ['work'])
+
+
+class TestQueue(TestCase):
+    """Runner job queues"""
+
+    def test_queues_are_per_runner(self):
+        """Jobs added to one runner are not seen by another"""
+        first, second = NullRunner(), NullRunner()
+        first.add_job(EchoJob("only_in_first"))
+        self.assertEqual(list(second.run()), [])
+        self.assertEqual(len(list(first.run())), 1)
+
+    def test_jobs_pulled_lazily(self):
+        """Job iterables are consumed no further than the lookahead"""
+        created = []
+
+        def jobs():
+            for i in range(10):
+                created.append(i)
+                yield EchoJob("lazy_{}".format(i))
+
+        runner = NullRunner(jobs(), lookahead=2)
+        self.assertEqual(created, [])
+        run = runner.run()
+        next(run)
+        self.assertEqual(len(created), 3)
+        self.assertEqual(len(list(run)), 9)
+
+    def test_priority_queue(self):
+        """Higher priority jobs run first, ties in submission order"""
+        jobs = [EchoJob(name) for name in ("a", "b", "c")]
+        jobs[2].set_priority(1)
+        runner = NullRunner(jobs, priority=True)
+        self.assertEqual([job.name for job, _ in runner.run()], ["c", "a", "b"])
+
+
+class CopyInputJob(BundledInputJob):
+    @property
+    def command(self):
+        return ['cp', self.input_filename, self.name + '.log']
+
+
+class TestBundledInputs(TestCase):
+    """Jobs with inputs extracted from a bundle"""
+
+    def test_extracted_into_scratch(self):
+        """Bundled inputs are extracted into scratch, outputs staged back"""
+        with tempfile.TemporaryDirectory() as tmp:
+            bundle_path = os.path.join(tmp, 'inputs.sqlite')
+            with InputBundle(bundle_path, 'w') as bundle:
+                bundle.add('hf/h2.gjf', 'h2 input')
+                bundle.add('hf/h2o.gjf', 'h2o input')
+            runner = LocalRunner(CopyInputJob.from_bundle(bundle_path, root=tmp),
+                                 scratch_directory=tmp)
+            self.assertTrue(all(status for job, status in runner.run()))
+            self.assertEqual(sorted(os.listdir(os.path.join(tmp, 'hf'))),
+                             ['h2.log', 'h2o.log'])
+            with open(os.path.join(tmp, 'hf', 'h2o.log')) as f:
+                self.assertEqual(f.read(), 'h2o input')
+
+    def test_relative_paths(self):
+        """Relative bundle paths and nested working directories work"""
+        with tempfile.TemporaryDirectory() as tmp, working_directory(tmp):
+            with InputBundle('inputs.sqlite', 'w') as bundle:
+                bundle.add('hf/h2.gjf', 'h2 input')
+            runner = LocalRunner(CopyInputJob.from_bundle('inputs.sqlite', root='runs'))
+            self.assertTrue(all(status for job, status in runner.run()))
+            self.assertEqual(sorted(os.listdir(os.path.join('runs', 'hf'))),
+                             ['h2.gjf', 'h2.log'])
@@ -0,0 +1,50 @@
+"""
+Spin component scaling tests
+"""
+from unittest import TestCase
+import numpy as np
+from qcpy.jobs.gaussian import available_methods
+from qcpy.results import ResultsStore
+from qcpy.scs import SpinComponents, register_scs_variant, scs_variants
+from qcpy.utils import scs_e2_correction
+
+
+def components(aa, bb, ab):
+    return {'alpha-alpha': {'e2': aa}, 'beta-beta': {'e2': bb}, 'alpha-beta': {'e2': ab}}
+
+
+RECORDS = [
+    ('h2', -1.13, components(0.0, 0.0, -0.03)),
+    ('h2o', -76.0, components(-0.05, -0.05, -0.15)),
+]
+
+
+class TestSpinComponentScaling(TestCase):
+    """Test case for bulk evaluation of SCS variants"""
+
+    def test_matches_per_system(self):
+        """All variants at once match scaling one system at a time"""
+        variants = scs_variants('mp2')
+        energies = SpinComponents.from_records(RECORDS).energies(variants)
+        for i, (system, reference, sc) in enumerate(RECORDS):
+            for j, name in enumerate(energies.columns):
+                a, b = variants[name]
+                self.assertAlmostEqual(energies.values[i, j],
+                                       reference + scs_e2_correction(sc, a=a, b=b))
+
+    def test_register_variant(self):
+        """Registered variants are derived from the base calculation,
+        including from stored spin components"""
+        register_scs_variant('test-mp2', a=1.0, b=0.5)
+        try:
+            self.assertEqual(available_methods['test-mp2'].redundancy, 'mp2')
+            self.assertEqual(scs_variants()['test-mp2'], (1.0, 0.5))
+            with ResultsStore(':memory:') as store:
+                store.add_spin_components('W4', 'def2svp', 'mp2',
+                                          SpinComponents.from_records(RECORDS))
+                stored = store.spin_components('W4')
+                energies = stored.energies({'test-mp2': (1.0, 0.5)})
+            self.assertEqual(energies.rows, ['h2', 'h2o'])
+            np.testing.assert_allclose(energies.column('test-mp2'), [-1.16, -76.2])
+        finally:
+            del available_methods['test-mp2']
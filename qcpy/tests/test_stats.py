@@ -0,0 +1,52 @@
+"""
+Error statistics tests
+"""
+from unittest import TestCase
+import numpy as np
+from qcpy.stats import error_statistics, bootstrap_confidence_interval, weighted_mad, HARTREE
+
+ERRORS = np.array([
+    [1.0, -2.0, 3.0, -4.0],
+    [0.5, np.nan, 0.5, -0.5],
+    [np.nan] * 4,
+])
+
+
+class TestErrorStatistics(TestCase):
+    """Test case for error statistics over methods x reactions"""
+
+    def test_statistics(self):
+        """Statistics ignore missing values"""
+        stats = error_statistics(ERRORS)
+        np.testing.assert_allclose(stats['mad'][:2], [2.5, 0.5])
+        np.testing.assert_allclose(stats['msd'][:2], [-0.5, 0.5 / 3])
+        np.testing.assert_allclose(stats['rmsd'][:2], [np.sqrt(7.5), 0.5])
+        np.testing.assert_allclose(stats['max'][:2], [4.0, 0.5])
+        self.assertEqual(stats['count'].tolist(), [4, 3, 0])
+        self.assertTrue(np.isnan(stats['mad'][2]))
+
+    def test_bootstrap_batches(self):
+        """Bootstrap intervals do not depend on the batch size"""
+        lower, upper = bootstrap_confidence_interval(ERRORS, samples=200)
+        batched = bootstrap_confidence_interval(ERRORS, samples=200, max_elements=10)
+        np.testing.assert_array_equal(lower, batched[0])
+        self.assertTrue(lower[0] <= 2.5 <= upper[0])
+        self.assertTrue(np.isnan(upper[2]))
+
+    def test_weighted_mad(self):
+        """Weighted MADs skip benchmarks a method has no values for"""
+        mads = np.array([[1.0, np.nan], [3.0, 2.0]])
+        counts = np.array([[2, 0], [2, 4]])
+        wtmad = weighted_mad(mads, counts, [10.0, 20.0], scale=20.0)
+        np.testing.assert_allclose(wtmad, [(2 * 2 * 1.0 + 2 * 1 * 3.0) / 4, 2.0])
+
+    def test_weighted_mad_units(self):
+        """Weighted MADs are the same whatever the units"""
+        mads = np.array([[1.0, 0.5], [3.0, 2.0]])
+        counts = np.array([[2, 3], [2, 4]])
+        references = np.array([10.0, 80.0])
+        wtmad = weighted_mad(mads, counts, references)
+        for units in ('ev', 'kj/mol', 'hartree'):
+            factor = HARTREE[units] / HARTREE['kcal/mol']
+            converted = weighted_mad(mads * factor, counts, references * factor, units=units)
+            np.testing.assert_allclose(converted / factor, wtmad)
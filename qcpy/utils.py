@@ -1,8 +1,12 @@
 """Misc utility functions/classes"""
 import os
+import json
+import hashlib
 import numpy as np
 import logging
 
+from .data import data_file
+
 LOG = logging.getLogger(__name__)
 
 
@@ -13,8 +17,8 @@ class working_directory:
     def __init__(self, directory, create=False):
         if directory:
             self.directory = os.path.expanduser(directory)
-            if not os.path.exists(self.directory) and create:
-                os.mkdir(self.directory)
+            if create:
+                os.makedirs(self.directory, exist_ok=True)
         else:
             self.directory = None
 
@@ -58,5 +62,202 @@ def scs_e2_correction(components, *, a=1.0, b=1.0):
     return correction
 
 
-def d3_correction():
-    pass
+# Angstrom, matching qcpy.geometry
+BOHR = 0.5291772105638411
+# real space cutoffs (bohr) for coordination numbers and the
+# two body energy, as in s-dftd3
+D3_CN_CUTOFF = 40.0
+D3_DISP2_CUTOFF = 60.0
+D3_KCN = 16.0
+D3_WEIGHT_FACTOR = 4.0
+# Gaussian keywords for functionals known to the parameter set by another name
+D3_GAUSSIAN_ALIASES = {
+    'pbepbe': 'pbe',
+    'pbe1pbe': 'pbe0',
+    'pw91pw91': 'pw91',
+    'tpsstpss': 'tpss',
+    'hseh1pbe': 'hse06',
+    'thcth': 'tauhcth',
+    'thcthhyb': 'tauhcthhyb',
+}
+_D3_REFERENCE = None
+_D3BJ_PARAMETERS = None
+
+
+def d3_reference():
+    """The D3 reference data (see qcpy.data), loaded on first use.
+    Covalent radii are in bohr and scaled by 4/3, and r4_over_r2 is
+    sqrt(0.5 * <r4>/<r2> * sqrt(Z)) as used for C8 coefficients"""
+    global _D3_REFERENCE
+    if _D3_REFERENCE is None:
+        with np.load(data_file('d3_reference.npz')) as data:
+            reference = {k: data[k] for k in data.files}
+        z = np.arange(len(reference['r4_over_r2']))
+        reference['r4_over_r2'] = np.sqrt(0.5 * reference['r4_over_r2'] * np.sqrt(z))
+        reference['covalent_radii'] = reference['covalent_radii'] * 4.0 / 3.0 / BOHR
+        _D3_REFERENCE = reference
+    return _D3_REFERENCE
+
+
+def d3bj_parameters(functional):
+    """The D3(BJ) parameters (s6, s8, a1, a2) for functional,
+    raising a KeyError if there are none
+
+    >>> d3bj_parameters('B3LYP')
+    {'s6': 1.0, 's8': 1.9889, 'a1': 0.3981, 'a2': 4.4211}
+    """
+    global _D3BJ_PARAMETERS
+    if _D3BJ_PARAMETERS is None:
+        with open(data_file('d3bj_parameters.json')) as f:
+            _D3BJ_PARAMETERS = json.load(f)
+    name = functional.lower().replace('-', '')
+    name = D3_GAUSSIAN_ALIASES.get(name, name)
+    name = _D3BJ_PARAMETERS['aliases'].get(name, name)
+    parameters = _D3BJ_PARAMETERS['parameters'][name]
+    return {k: parameters[k] for k in ('s6', 's8', 'a1', 'a2')}
+
+
+def _row_chunks(n, columns, max_elements):
+    """Slices of rows of an n x columns pair array, each holding
+    at most max_elements values (at least one row)"""
+    step = max(1, max_elements // max(columns, 1))
+    for start in range(0, n, step):
+        yield slice(start, min(start + step, n))
+
+
+def _pair_distances(positions, rows):
+    return np.linalg.norm(positions[rows, np.newaxis, :] - positions[np.newaxis, :, :], axis=-1)
+
+
+def d3_coordination_numbers(numbers, positions, *, max_elements=2**22):
+    """D3 coordination numbers of the atoms with atomic numbers
+    at positions (bohr)"""
+    rcov = d3_reference()['covalent_radii'][numbers]
+    n = len(numbers)
+    cn = np.zeros(n)
+    for rows in _row_chunks(n, n, max_elements):
+        r = _pair_distances(positions, rows)
+        index = np.arange(rows.start, rows.stop)
+        r[index - rows.start, index] = np.inf
+        with np.errstate(divide='ignore'):
+            r0_over_r = (rcov[rows, np.newaxis] + rcov[np.newaxis, :]) / r
+        count = 1.0 / (1.0 + np.exp(-D3_KCN * (r0_over_r - 1.0)))
+        count[r > D3_CN_CUTOFF] = 0.0
+        cn[rows] = count.sum(axis=1)
+    return cn
+
+
+def d3_reference_weights(numbers, cn):
+    """Gaussian weights (atoms x references) of the reference
+    systems of each atom given its coordination number"""
+    reference_cn = d3_reference()['reference_cn'][numbers]
+    present = reference_cn >= 0
+    weights = np.where(present,
+                       np.exp(-D3_WEIGHT_FACTOR * (reference_cn - cn[:, np.newaxis])**2),
+                       0.0)
+    norm = weights.sum(axis=1, keepdims=True)
+    # far from every reference, all the weight goes to the highest CN one
+    exceptional = (norm[:, 0] == 0.0)
+    if exceptional.any():
+        highest = reference_cn[exceptional] == reference_cn[exceptional].max(axis=1, keepdims=True)
+        weights[exceptional] = highest
+        norm[exceptional] = 1.0
+    return weights / norm
+
+
+def d3_c6(numbers, weights, rows=slice(None)):
+    """C6 coefficients between the atoms in rows and all atoms,
+    interpolated from the reference C6 coefficients"""
+    c6 = d3_reference()['c6'][numbers[rows, np.newaxis], numbers[np.newaxis, :]]
+    return np.einsum('ia,ijab,jb->ij', weights[rows], c6, weights, optimize=True)
+
+
+def d3bj_dispersion(numbers, positions, parameters, *, max_elements=2**22):
+    """Two body D3(BJ) dispersion energies (hartree) of the atoms with
+    atomic numbers at positions (bohr), one for each of the parameter
+    sets in parameters (dicts with s6, s8, a1 and a2).
+
+    The geometry dependent parts are evaluated once, and the pair arrays
+    are built a block of rows at a time so that no more than roughly
+    max_elements values are held at once.
+    """
+    numbers = np.asarray(numbers, dtype=int)
+    positions = np.asarray(positions, dtype=np.float64)
+    s6, s8, a1, a2 = (np.array([p[k] for p in parameters], dtype=np.float64)[:, np.newaxis, np.newaxis]
+                      for k in ('s6', 's8', 'a1', 'a2'))
+    n = len(numbers)
+    r4_over_r2 = d3_reference()['r4_over_r2'][numbers]
+    weights = d3_reference_weights(numbers, d3_coordination_numbers(
+        numbers, positions, max_elements=max_elements))
+    energies = np.zeros(len(parameters))
+    columns = n * max(len(parameters), 49)
+    for rows in _row_chunks(n, columns, max_elements):
+        r = _pair_distances(positions, rows)
+        # each pair once, within the cutoff
+        index = np.arange(rows.start, rows.stop)
+        pairs = (index[:, np.newaxis] < np.arange(n)[np.newaxis, :]) & (r <= D3_DISP2_CUTOFF)
+        qq = 3.0 * r4_over_r2[rows, np.newaxis] * r4_over_r2[np.newaxis, :]
+        c6 = np.where(pairs, d3_c6(numbers, weights, rows), 0.0)
+        cutoff_radius = a1 * np.sqrt(qq) + a2
+        r6 = r**6
+        r8 = r6 * r * r
+        e = s6 / (r6 + cutoff_radius**6) + s8 * qq / (r8 + cutoff_radius**8)
+        energies -= (c6 * e).sum(axis=(1, 2))
+    return energies
+
+
+def d3_correction(atomic_numbers, positions, *, functional='b3lyp'):
+    """D3(BJ) dispersion correction (hartree) for functional of the
+    atoms with atomic_numbers at positions (bohr)"""
+    return d3bj_dispersion(atomic_numbers, positions, [d3bj_parameters(functional)])[0]
+
+
+def geometry_fingerprint(numbers, positions, *, decimals=6):
+    """SHA-256 hex digest identifying atomic numbers at
+    positions, rounded to decimals"""
+    h = hashlib.sha256()
+    h.update(np.asarray(numbers, dtype=np.int64).tobytes())
+    # + 0.0 so that -0.0 and 0.0 hash the same
+    h.update((np.round(np.asarray(positions, dtype=np.float64), decimals) + 0.0).tobytes())
+    return h.hexdigest()
+
+
+def _parameter_key(parameters):
+    return ','.join('{}={!r}'.format(k, float(parameters[k])) for k in ('s6', 's8', 'a1', 'a2'))
+
+
+class D3Cache:
+    """D3(BJ) corrections keyed by geometry fingerprint and parameter set,
+    optionally persisted as JSON at path, so each geometry is evaluated
+    once for all the parameter sets it is needed with, and never again
+    on later runs"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.values = {}
+        self.computed = 0
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self.values = json.load(f)
+        self._modified = False
+
+    def corrections(self, numbers, positions, parameters):
+        """Dispersion corrections (hartree) for each of the named
+        parameter sets in parameters ({name: dict with s6, s8, a1, a2})"""
+        cached = self.values.setdefault(geometry_fingerprint(numbers, positions), {})
+        keys = {name: _parameter_key(p) for name, p in parameters.items()}
+        missing = sorted({key: name for name, key in keys.items() if key not in cached}.items())
+        if missing:
+            energies = d3bj_dispersion(numbers, positions, [parameters[name] for _, name in missing])
+            for (key, _), energy in zip(missing, energies):
+                cached[key] = float(energy)
+            self.computed += len(missing)
+            self._modified = True
+        return {name: cached[key] for name, key in keys.items()}
+
+    def write(self):
+        """Write the cache to path if anything was added"""
+        if self.path is not None and self._modified:
+            with open(self.path, 'w') as f:
+                json.dump(self.values, f, sort_keys=True)
+            self._modified = False
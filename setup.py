@@ -19,13 +19,15 @@ setup(name='qcpy',
       license='GPLv3',
       packages=find_packages(),
       package_data={
-         'qcpy.templates': ['*.template']  # include all templates
+         'qcpy.templates': ['*.template'],  # include all templates
+         'qcpy.data': ['*.npz', '*.json'],
       },
       entry_points={
           'console_scripts': [
               'chembench-init = qcpy.cli:generate_inputs',
               'chembench-process = qcpy.cli:process_outputs_main',
-              'chembench-process-batch = qcpy.cli:process_outputs_batch'
+              'chembench-process-batch = qcpy.cli:process_outputs_batch',
+              'chembench-stats = qcpy.cli:statistics_main'
           ]
       },
       install_requires=['numpy', 'jinja2', 'tqdm'],